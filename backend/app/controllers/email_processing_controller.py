@@ -1,32 +1,83 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
-from typing import Optional
-import tempfile
+from typing import Optional, List
+from pydantic import BaseModel
 import os
+import threading
 from app.services.email_processing_engine import EmailProcessingEngine
-from app.database import get_db
+from app.services.classification_batcher import ClassificationBatcher
+from app.services.inference_executor import InferenceExecutor, ExecutorSaturatedError
+from app.services.result_cache import ResultCache
+from app.services.mailbox_ingestion import MailboxIngestion
+from app.utils.read_mailbox import MAILBOX_EXTENSIONS, MESSAGE_EXTENSIONS
+from app.database import get_db, pool_status
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
-# Criar engine única na inicialização do módulo
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+MAILBOX_MAX_MESSAGES = int(os.getenv("MAILBOX_MAX_MESSAGES", "5000"))
+
+
+class BatchEmailRequest(BaseModel):
+    emails: List[str]
+
+
+# Engine única e sem sessão: cada requisição passa a própria sessão do get_db
 global_engine: Optional[EmailProcessingEngine] = None
+_engine_lock = threading.Lock()
 
-def get_engine(db: Session) -> EmailProcessingEngine:
+def get_engine() -> EmailProcessingEngine:
+    # Só é chamada nas threads do executor: a primeira chamada carrega spaCy,
+    # encoder e classificador, o que não pode acontecer no event loop
     global global_engine
     if global_engine is None:
-        global_engine = EmailProcessingEngine(db)
+        with _engine_lock:
+            if global_engine is None:
+                global_engine = EmailProcessingEngine()
     return global_engine
 
 
+def engine_call(method: str, *args):
+    return getattr(get_engine(), method)(*args)
+
+
+async def run_inference(fn, *args):
+    # Roda o pipeline no executor limitado; sem vaga, responde 503
+    try:
+        return await InferenceExecutor().run(fn, *args)
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
 @router.post("/process-text")
 async def process_text_email(
     email_text: str = Form(...),
     db: Session = Depends(get_db)
 ):
     try:
-        engine = get_engine(db)
-        result = engine.process_email(email_text, "text")
+        result = await run_inference(engine_call, "process_email", email_text, "text", db)
         return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/process-batch")
+async def process_batch_emails(
+    request: BatchEmailRequest,
+    db: Session = Depends(get_db)
+):
+    if not request.emails:
+        raise HTTPException(status_code=400, detail="Lista de emails vazia")
+    if len(request.emails) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_BATCH_SIZE} emails por lote")
+
+    try:
+        results = await run_inference(engine_call, "process_emails", request.emails, "text", db)
+        return results
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -40,18 +91,11 @@ async def process_pdf_email(
         raise HTTPException(status_code=400, detail="Só aceita PDF")
 
     try:
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        content = await file.read()
-        temp_file.write(content)
-        temp_file.close()
-
-        engine = get_engine(db)
-        result = engine.process_email(temp_file.name, "pdf")
-
-        os.unlink(temp_file.name)
-
-        return result
+        # Lê direto do arquivo do upload, sem copiar para um temporário
+        return await run_inference(engine_call, "process_email", file.file, "pdf", db)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -65,17 +109,51 @@ async def process_txt_email(
         raise HTTPException(status_code=400, detail="Só aceita TXT")
 
     try:
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.txt', mode='w+', encoding='utf-8')
-        content = await file.read()
-        temp_file.write(content.decode('utf-8'))
-        temp_file.close()
+        return await run_inference(engine_call, "process_email", file.file, "txt", db)
 
-        engine = get_engine(db)
-        result = engine.process_email(temp_file.name, "txt")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        os.unlink(temp_file.name)
 
-        return result
+@router.post("/process-mailbox")
+async def process_mailbox(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    if not file.filename.lower().endswith((".zip",) + MAILBOX_EXTENSIONS + MESSAGE_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Só aceita ZIP, mbox ou EML")
 
+    try:
+        # Caixas maiores que o limite devem ser importadas com python -m app.ingest_mailbox
+        return await run_inference(
+            lambda: MailboxIngestion(engine=get_engine()).run(
+                file.file, db=db, name=file.filename, max_messages=MAILBOX_MAX_MESSAGES, keep_results=True
+            )
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stats/batcher")
+async def get_batcher_stats():
+    return ClassificationBatcher().stats()
+
+
+@router.get("/stats/executor")
+async def get_executor_stats():
+    return InferenceExecutor().stats()
+
+
+@router.get("/stats/cache")
+async def get_cache_stats():
+    return ResultCache().stats()
+
+
+@router.get("/stats/db-pool")
+async def get_db_pool_stats():
+    return pool_status()
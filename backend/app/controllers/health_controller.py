@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from app.database import engine
+from app.services.model_warmup import ModelWarmup, MODEL_WARMUP
+
+router = APIRouter(tags=["Health"])
+
+
+def check_database() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        print(f"Erro ao conectar no banco: {e}")
+        return False
+
+
+@router.get("/live")
+async def live():
+    # O processo responde: não depende de banco nem de modelos
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def ready():
+    database = await run_in_threadpool(check_database)
+    models = ModelWarmup().status()
+
+    # Com MODEL_WARMUP=false (réplicas só de histórico) os modelos não entram na conta
+    is_ready = database and (not MODEL_WARMUP or models["state"] == "ready")
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "not_ready", "database": database, "models": models},
+    )
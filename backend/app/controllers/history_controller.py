@@ -1,55 +1,234 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Dict, Any, Optional
+from datetime import datetime
+import csv
+import io
+import json
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.services.email_history_service import EmailHistoryService
-from app.models.email_history import EmailHistory
+from starlette.concurrency import run_in_threadpool
+from app.database import get_db, get_read_db, SessionLocal
+from app.services.email_history_service import EmailHistoryService, AsyncEmailHistoryService
+from app.services.history_writer import HistoryWriter
+from app.services.online_learning import OnlineTrainer, ONLINE_LEARNING_ENABLED
 
 router = APIRouter(tags=["Histórico"])
 
+CATEGORIES = ["Produtivo", "Improdutivo"]
+EXPORT_COLUMNS = ["id", "text_preview", "category", "ai_confidence", "response_preview", "analyzed_at", "email_type"]
+EXPORT_CHUNK_ROWS = 500
 
-@router.get("/")
-async def get_all_emails(db: Session = Depends(get_db)):
+
+class CategoryCorrection(BaseModel):
+    category: str
+    text: Optional[str] = None  # texto original, para emails gravados sem o texto pré-processado
+
+
+def history_filters(
+    email_type: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    min_confidence: Optional[float] = Query(None, ge=0, le=1),
+    max_confidence: Optional[float] = Query(None, ge=0, le=1),
+) -> Dict[str, Any]:
+    # A categoria fica de fora: em /category/{category} ela vem do path
+    return {
+        "email_type": email_type,
+        "date_from": date_from,
+        "date_to": date_to,
+        "min_confidence": min_confidence,
+        "max_confidence": max_confidence,
+    }
+
+
+async def call_service(db, method: str, *args, **kwargs):
+    # AsyncSession (DB_ASYNC_ENABLED) roda no event loop; Session comum vai para o threadpool
+    if isinstance(db, Session):
+        return await run_in_threadpool(getattr(EmailHistoryService(db), method), *args, **kwargs)
+    return await getattr(AsyncEmailHistoryService(db), method)(*args, **kwargs)
+
+
+async def list_page(db, response: Response, limit: int, cursor: Optional[str], filters: Dict[str, Any]):
+    # O corpo continua sendo uma lista; o cursor da próxima página vai no header
     try:
-        service = EmailHistoryService(db)
-        emails = service.get_all_emails()
-        
-        result = []
-        for email in emails:
-            result.append(email.to_dict())
-        
-        return result
-    
+        emails, next_cursor = await call_service(db, "list_emails", limit=limit, cursor=cursor, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return emails
+
+
+@router.get("/")
+async def get_all_emails(
+    response: Response,
+    category: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    filters: Dict[str, Any] = Depends(history_filters),
+    db = Depends(get_read_db)
+):
+    if category is not None and category not in CATEGORIES:
+        raise HTTPException(status_code=400, detail="Categoria inválida")
+
+    filters["category"] = category
+    return await list_page(db, response, limit, cursor, filters)
+
 
 @router.get("/category/{category}")
-async def get_emails_by_category(category: str, db: Session = Depends(get_db)):
-    if category not in ["Produtivo", "Improdutivo"]:
+async def get_emails_by_category(
+    category: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    filters: Dict[str, Any] = Depends(history_filters),
+    db = Depends(get_read_db)
+):
+    if category not in CATEGORIES:
         raise HTTPException(status_code=400, detail="Categoria inválida")
-    
+
+    filters["category"] = category
+    return await list_page(db, response, limit, cursor, filters)
+
+
+@router.get("/export")
+def export_emails(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    category: Optional[str] = Query(None),
+    filters: Dict[str, Any] = Depends(history_filters),
+):
+    if category is not None and category not in CATEGORIES:
+        raise HTTPException(status_code=400, detail="Categoria inválida")
+    filters["category"] = category
+
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(filters),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=email_history.csv"},
+        )
+    return StreamingResponse(
+        export_ndjson(filters),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=email_history.ndjson"},
+    )
+
+
+def export_rows(filters: Dict[str, Any]):
+    # Sessão própria: precisa continuar aberta enquanto a resposta é transmitida
+    db = SessionLocal()
     try:
-        service = EmailHistoryService(db)
-        emails = service.get_emails_by_category(category)
-        
-        result = []
-        for email in emails:
-            result.append(email.to_dict())
-        
-        return result
-    
+        yield from EmailHistoryService(db).stream_emails(**filters)
+    finally:
+        db.close()
+
+
+def export_ndjson(filters: Dict[str, Any]):
+    chunk = []
+    for row in export_rows(filters):
+        chunk.append(json.dumps(row, ensure_ascii=False))
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def export_csv(filters: Dict[str, Any]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    rows = 0
+    for row in export_rows(filters):
+        writer.writerow(row)
+        rows += 1
+        if rows % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+@router.get("/ticket/{ticket}")
+async def get_email_by_ticket(ticket: str, db = Depends(get_read_db)):
+    # Resultado gravado de forma assíncrona (write-behind)
+    # "pending" (no buffer) ou "spilled" (no arquivo, esperando nova tentativa)
+    state = HistoryWriter().pending(ticket)
+    if state is not None:
+        return {"status": state, "email": None}
+
+    try:
+        email = await call_service(db, "get_by_ticket", ticket)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if email is None:
+        raise HTTPException(status_code=404, detail="Ticket não encontrado")
+    return {"status": "saved", "email": email}
+
+
+@router.patch("/{email_id}")
+async def correct_email_category(email_id: int, correction: CategoryCorrection, db: Session = Depends(get_db)):
+    """Corrige a categoria de um email e grava o exemplo para o treino online"""
+    if correction.category not in CATEGORIES:
+        raise HTTPException(status_code=400, detail="Categoria inválida")
+
+    try:
+        corrected = await run_in_threadpool(
+            EmailHistoryService(db).correct_category, email_id, correction.category, correction.text
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if corrected is None:
+        raise HTTPException(status_code=404, detail="Email não encontrado")
+
+    email, example = corrected
+    # O modelo é atualizado em segundo plano; este processo aplica já, os outros no próximo ciclo
+    if ONLINE_LEARNING_ENABLED:
+        OnlineTrainer().notify()
+    return {"email": email, "training_example": example.to_dict()}
+
+
+@router.get("/stats/training")
+def get_training_stats():
+    return OnlineTrainer().stats()
+
+
+@router.get("/stats/writer")
+def get_writer_stats():
+    return HistoryWriter().stats()
+
 
 @router.get("/stats")
-async def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db = Depends(get_read_db)):
     """Pega estatísticas simples"""
     try:
-        service = EmailHistoryService(db)
-        stats = service.count_emails()
+        stats = await call_service(db, "count_emails")
         return stats
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stats/series")
+async def get_stats_series(
+    days: int = Query(30, ge=1, le=366),
+    category: Optional[str] = Query(None),
+    db = Depends(get_read_db)
+):
+    """Série diária de emails processados"""
+    if category is not None and category not in CATEGORIES:
+        raise HTTPException(status_code=400, detail="Categoria inválida")
+
+    try:
+        return await call_service(db, "stats_series", days=days, category=category)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
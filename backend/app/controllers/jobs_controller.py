@@ -0,0 +1,79 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Query
+import json
+import os
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.controllers.email_processing_controller import BatchEmailRequest, MAX_BATCH_SIZE
+from app.services.job_queue import JobQueue
+from app.services.job_worker import JobWorkerPool
+from app.utils.read_mailbox import MAILBOX_EXTENSIONS, MESSAGE_EXTENSIONS
+
+router = APIRouter(tags=["Jobs"])
+
+JOB_MAX_UPLOAD_BYTES = int(os.getenv("JOB_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+JOB_MAX_BATCH_SIZE = int(os.getenv("JOB_MAX_BATCH_SIZE", str(MAX_BATCH_SIZE * 100)))
+
+
+def upload_kind(filename: str) -> str:
+    lowered = filename.lower()
+    if lowered.endswith(".pdf"):
+        return "pdf"
+    if lowered.endswith(".txt"):
+        return "txt"
+    if lowered.endswith((".zip",) + MAILBOX_EXTENSIONS + MESSAGE_EXTENSIONS):
+        return "mailbox"
+    raise HTTPException(status_code=400, detail="Só aceita PDF, TXT, ZIP, mbox ou EML")
+
+
+# Rotas síncronas: o FastAPI as executa no threadpool, sem bloquear o event loop
+@router.post("/batch", status_code=202)
+def submit_batch(request: BatchEmailRequest, db: Session = Depends(get_db)):
+    if not request.emails:
+        raise HTTPException(status_code=400, detail="Lista de emails vazia")
+    if len(request.emails) > JOB_MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Máximo de {JOB_MAX_BATCH_SIZE} emails por job")
+
+    try:
+        payload = json.dumps(request.emails, ensure_ascii=False).encode("utf-8")
+        job = JobQueue(db).enqueue("batch", payload, total=len(request.emails))
+        return {"job_id": job.id, "status": job.status}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/upload", status_code=202)
+def submit_upload(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    kind = upload_kind(file.filename)
+
+    payload = file.file.read(JOB_MAX_UPLOAD_BYTES + 1)
+    if len(payload) > JOB_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Arquivo maior que {JOB_MAX_UPLOAD_BYTES} bytes")
+
+    try:
+        job = JobQueue(db).enqueue(kind, payload, filename=file.filename)
+        return {"job_id": job.id, "status": job.status}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stats/workers")
+def get_worker_stats():
+    return JobWorkerPool().stats()
+
+
+@router.get("/{job_id}")
+def get_job(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    # Resultados por email paginados com offset/limit (total em result_page)
+    try:
+        job = JobQueue(db).get(job_id, offset, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
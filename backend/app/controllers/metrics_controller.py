@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+from app.services import metrics
+
+router = APIRouter(tags=["Métricas"])
+
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    # Formato texto do Prometheus: histogramas por etapa, tamanhos de lote, filas, cache e pool do banco
+    if metrics.prometheus is None:
+        raise HTTPException(status_code=503, detail="Métricas desativadas (METRICS_ENABLED=false ou prometheus_client ausente)")
+    try:
+        content, content_type = metrics.render()
+        return Response(content=content, headers={"Content-Type": content_type})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
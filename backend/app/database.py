@@ -1,7 +1,8 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 
 load_dotenv()
 
@@ -9,15 +10,91 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL não está definido! Configure a variável de ambiente DATABASE_URL.")
 
-engine = create_engine(DATABASE_URL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_ASYNC_ENABLED = os.getenv("DB_ASYNC_ENABLED", "false").lower() == "true"
+
+
+def pool_options(url: str) -> dict:
+    # SQLite (testes/benchmarks) usa o pool padrão do SQLAlchemy
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def async_database_url(url: str) -> str:
+    # postgresql+psycopg2://... -> postgresql+asyncpg://...
+    explicit = os.getenv("ASYNC_DATABASE_URL")
+    if explicit:
+        return explicit
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("postgresql") or scheme == "postgres":
+        return f"postgresql+asyncpg://{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Caminho assíncrono opcional (asyncpg): leituras do histórico sem ocupar threads
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC_ENABLED:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 from app.models.email import Email
 from app.models.email_history import EmailHistory
+from app.models.email_stats import EmailStats
+from app.models.processing_job import ProcessingJob
+from app.models.processing_job_result import ProcessingJobResult
+from app.models.training_example import TrainingExample
 
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+
+    # create_all não adiciona índices novos em tabelas que já existem
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    # Tabela de estatísticas recém-ativada: preenche a partir do histórico existente
+    from app.services.email_history_service import EmailHistoryService, STATS_TABLE_ENABLED
+    if STATS_TABLE_ENABLED:
+        db = SessionLocal()
+        try:
+            EmailHistoryService(db).rebuild_stats(only_if_empty=True)
+        finally:
+            db.close()
+
+def add_missing_columns():
+    # create_all não altera tabelas existentes: adiciona colunas novas (sempre anuláveis)
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
 
 def get_db():
     db = SessionLocal()
@@ -25,3 +102,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_read_db():
+    # Sessão para rotas de leitura: AsyncSession quando DB_ASYNC_ENABLED, senão Session comum
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            # close() pode fazer rollback na conexão: fora do event loop
+            await run_in_threadpool(db.close)
+
+def pool_status() -> dict:
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    return status
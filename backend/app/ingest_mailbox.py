@@ -0,0 +1,48 @@
+# Importa uma caixa de email inteira (mbox, diretório de .eml ou ZIP) e grava o histórico.
+#
+# Uso (a partir de backend/):
+#     python -m app.ingest_mailbox caixa.mbox
+#     python -m app.ingest_mailbox exportacao.zip --batch-size 128
+#     python -m app.ingest_mailbox emails/ --restart   # ignora o checkpoint anterior
+#
+# Se a importação for interrompida, rodar o mesmo comando continua de onde parou.
+import argparse
+import json
+import os
+from app.database import SessionLocal, create_tables
+from app.services.email_classifier import EmailClassifier
+from app.services.mailbox_ingestion import INGEST_BATCH_SIZE, MailboxIngestion, checkpoint_path_for
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classifica e grava no histórico todas as mensagens de uma caixa de email")
+    parser.add_argument("source", help="Arquivo mbox, .eml, .zip ou diretório com .eml")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Mensagens classificadas por lote")
+    parser.add_argument("--checkpoint", help="Arquivo de checkpoint (padrão: derivado do caminho de origem)")
+    parser.add_argument("--restart", action="store_true", help="Descarta o checkpoint e importa tudo de novo")
+    parser.add_argument("--dry-run", action="store_true", help="Classifica sem gravar no histórico nem no checkpoint")
+    args = parser.parse_args()
+
+    checkpoint = None if args.dry_run else (args.checkpoint or checkpoint_path_for(args.source))
+    if checkpoint and args.restart and os.path.exists(checkpoint):
+        os.unlink(checkpoint)
+
+    def progress(info):
+        print(f"{info['processed']} processadas, {info['skipped']} já importadas, "
+              f"{info['errors']} erros ({info['messages_per_second']} msg/s)", flush=True)
+
+    create_tables()
+    db = None if args.dry_run else SessionLocal()
+    try:
+        ingestion = MailboxIngestion(batch_size=args.batch_size, checkpoint_path=checkpoint, dry_run=args.dry_run)
+        summary = ingestion.run(args.source, db=db, progress=progress)
+    finally:
+        if db is not None:
+            db.close()
+        EmailClassifier.flush_embeddings()
+
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
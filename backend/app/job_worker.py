@@ -0,0 +1,31 @@
+# Sobe workers da fila de jobs separados da API (use JOB_WORKERS=0 na API).
+#
+# Uso (a partir de backend/):
+#     python -m app.job_worker              # JOB_WORKERS processos
+#     python -m app.job_worker --workers 4
+import argparse
+import signal
+from app.database import create_tables
+from app.services.job_worker import JOB_WORKERS, JobWorkerPool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa os jobs de processamento enfileirados em /api/jobs")
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS), help="Número de processos worker")
+    args = parser.parse_args()
+
+    create_tables()
+    pool = JobWorkerPool(args.workers)
+
+    # SIGTERM (ex.: systemd/docker) encerra como Ctrl+C: termina o job atual e sai
+    signal.signal(signal.SIGTERM, lambda *_: pool.stop())
+    pool.start()
+    print(f"{args.workers} worker(s) aguardando jobs", flush=True)
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
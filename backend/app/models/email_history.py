@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -12,17 +12,31 @@ class EmailHistory(Base):
     response_preview = Column(String(200))      
     analyzed_at = Column(DateTime(timezone=True), server_default=func.now())
     email_type = Column(String(20), default="text") 
+    ticket = Column(String(32), unique=True, index=True)  # gravação assíncrona (write-behind)
+    processed_content = Column(Text)  # texto pré-processado: vira exemplo de treino quando a categoria é corrigida
+
+    # Índices compostos para a paginação por cursor (analyzed_at, id) com e sem filtro
+    __table_args__ = (
+        Index("ix_email_history_analyzed_at_id", "analyzed_at", "id"),
+        Index("ix_email_history_category_analyzed_at_id", "category", "analyzed_at", "id"),
+        Index("ix_email_history_email_type_analyzed_at_id", "email_type", "analyzed_at", "id"),
+    )
 
     def __repr__(self):
         return f"<EmailHistory(id={self.id}, category='{self.category}')>"
 
     def to_dict(self):
+        return EmailHistory.format_row(self)
+
+    @staticmethod
+    def format_row(row):
+        # Aceita tanto a entidade quanto uma linha com apenas as colunas projetadas
         return {
-            "id": self.id,
-            "text_preview": self.text_preview,
-            "category": self.category,
-            "ai_confidence": round(self.ai_confidence, 3) if self.ai_confidence else None,
-            "response_preview": self.response_preview,
-            "analyzed_at": self.analyzed_at.isoformat() if self.analyzed_at else None,
-            "email_type": self.email_type
+            "id": row.id,
+            "text_preview": row.text_preview,
+            "category": row.category,
+            "ai_confidence": round(row.ai_confidence, 3) if row.ai_confidence else None,
+            "response_preview": row.response_preview,
+            "analyzed_at": row.analyzed_at.isoformat() if row.analyzed_at else None,
+            "email_type": row.email_type
         }
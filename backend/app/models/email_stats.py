@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Date, Float
+from app.database import Base
+
+class EmailStats(Base):
+    # Contadores pré-agregados por dia, categoria e tipo, atualizados a cada insert no histórico
+    __tablename__ = "email_stats"
+
+    day = Column(Date, primary_key=True)
+    category = Column(String(50), primary_key=True)
+    email_type = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<EmailStats(day={self.day}, category='{self.category}', email_type='{self.email_type}', count={self.count})>"
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, LargeBinary, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ProcessingJob(Base):
+    # Fila de jobs no próprio banco: a API só insere, os workers reservam e executam
+    __tablename__ = "processing_jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(20), nullable=False)           # batch | pdf | txt | mailbox
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | done | failed
+    filename = Column(String(255))
+    payload = Column(LargeBinary)                        # apagado quando o job termina
+    total = Column(Integer)
+    processed = Column(Integer, nullable=False, default=0)
+    result = Column(Text)                                # JSON
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker = Column(String(100))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_processing_jobs_status_created_at", "status", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<ProcessingJob(id='{self.id}', kind='{self.kind}', status='{self.status}')>"
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from app.database import Base
+
+class ProcessingJobResult(Base):
+    # Resultado compacto de cada email de um job (lote ou caixa de email). É gravado
+    # na mesma transação que o histórico do bloco: a consulta pagina no banco e um
+    # job que volta para a fila continua de onde parou, sem duplicar o histórico.
+    __tablename__ = "processing_job_results"
+
+    job_id = Column(String(32), ForeignKey("processing_jobs.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    item_key = Column(String(255))                 # message_id (caixa de email)
+    result = Column(Text, nullable=False)          # JSON
+
+    def __repr__(self):
+        return f"<ProcessingJobResult(job_id='{self.job_id}', position={self.position})>"
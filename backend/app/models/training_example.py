@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+class TrainingExample(Base):
+    # Exemplos de treino revisados (correções de categoria feitas no histórico).
+    # O treino online aplica em ordem de id; ao reiniciar, todos são reaplicados.
+    __tablename__ = "training_examples"
+
+    id = Column(Integer, primary_key=True, index=True)
+    history_id = Column(Integer, ForeignKey("email_history.id", ondelete="SET NULL"), index=True)
+    text = Column(Text, nullable=False)             # texto pré-processado (o que o classificador vê)
+    label = Column(String(50), nullable=False)
+    previous_label = Column(String(50))
+    source = Column(String(20), nullable=False, default="correction")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<TrainingExample(id={self.id}, label='{self.label}')>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "history_id": self.history_id,
+            "label": self.label,
+            "previous_label": self.previous_label,
+            "source": self.source,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
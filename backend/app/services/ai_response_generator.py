@@ -1,10 +1,24 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple, Union
+import os
 import random
+import threading
 from app.services.email_classifier import EmailClassifier
+from app.services.classification_batcher import ClassificationBatcher
+from app.services.template_index import TemplateIndex
+from app.utils.keyword_matcher import KeywordMatcher
+from app.utils.preprocessor_npl import analyze, analyze_many, PreprocessedText
+from app.services.metrics import stage
+
+KEYWORDS_FILE = os.getenv(
+    "KEYWORDS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils", "email_keywords.json"),
+)
+TEMPLATE_SELECTION = os.getenv("TEMPLATE_SELECTION", "embedding")  # embedding | random
 
 
 class AIResponseGenerator:
     _instance = None  # Singleton
+    _init_lock = threading.Lock()  # warm-up e primeira requisição podem chegar juntos
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -12,103 +26,172 @@ class AIResponseGenerator:
         return cls._instance
 
     def __init__(self):
-        if hasattr(self, "_initialized") and self._initialized:
-            return
-        self._initialized = True
-
-        self.email_classifier = EmailClassifier()
-
-        # Templates de resposta por categoria e tipo
-        self.response_templates = {
-            "Produtivo": {
-                "senha": [
-                    "Recebemos sua solicitação sobre redefinição de senha. Nossa equipe de TI foi notificada e você receberá as instruções por email em até 2 horas úteis.",
-                    "Sua solicitação de redefinição de senha foi encaminhada para o suporte técnico. Você receberá um email com as instruções em breve."
-                ],
-                "sistema": [
-                    "Identificamos o problema relatado em nosso sistema. Nossa equipe técnica já foi notificada e está trabalhando na correção.",
-                    "Recebemos seu relato sobre o erro no sistema. O caso foi encaminhado para nossa equipe de desenvolvimento."
-                ],
-                "suporte": [
-                    "Sua solicitação foi registrada e encaminhada para nossa equipe de suporte. Um atendente entrará em contato em até 24 horas úteis.",
-                    "Recebemos sua mensagem e ela foi direcionada para o setor responsável. Nossa equipe retornará com uma solução em breve."
-                ],
-                "financeiro": [
-                    "Sua questão financeira foi encaminhada para nosso departamento financeiro. Você receberá um retorno dentro de 48 horas úteis.",
-                    "Recebemos sua solicitação financeira. Nossa equipe do setor financeiro analisará seu caso e entrará em contato."
-                ],
-                "treinamento": [
-                    "Sua solicitação de treinamento foi registrada. Nossa equipe de capacitação entrará em contato para agendar uma sessão.",
-                    "Recebemos sua necessidade de treinamento adicional. Um especialista da nossa equipe agendará um horário para te auxiliar."
-                ],
-                "generico": [
-                    "Sua mensagem foi recebida e direcionada para o setor apropriado. Retornaremos com uma resposta em até 24 horas úteis.",
-                    "Recebemos sua solicitação. Nossa equipe analisará seu caso e fornecerá uma resposta adequada em breve."
-                ]
-            },
-            "Improdutivo": {
-                "felicitacoes": [
-                    "Muito obrigado pelas felicitações! Desejamos o mesmo para você e sua família.",
-                    "Agradecemos as felicitações! Que seja um período de muita alegria e prosperidade."
-                ],
-                "pessoal": [
-                    "Obrigado pela mensagem! Desejo tudo de bom para você.",
-                    "Agradeço pelo contato. Tenha um excelente dia!"
-                ],
-                "generico": [
-                    "Obrigado pela mensagem!",
-                    "Agradeço pelo contato."
-                ]
+        # Só marca como inicializado depois de carregar tudo: outra thread que
+        # chegue no meio do carregamento espera em vez de ver a instância pela metade
+        with AIResponseGenerator._init_lock:
+            if hasattr(self, "_initialized") and self._initialized:
+                return
+
+            self.email_classifier = EmailClassifier()
+            self.batcher = ClassificationBatcher()
+
+            # Palavras-chave por categoria e tipo, compiladas uma vez a partir de KEYWORDS_FILE
+            self.type_matchers = KeywordMatcher.from_file(KEYWORDS_FILE)
+
+            # Criado no primeiro uso: encodar os templates no master do gunicorn (antes do fork) não é seguro
+            self._template_index = None
+            self._template_lock = threading.Lock()
+
+            # Templates de resposta por categoria e tipo
+            self.response_templates = {
+                "Produtivo": {
+                    "senha": [
+                        "Recebemos sua solicitação sobre redefinição de senha. Nossa equipe de TI foi notificada e você receberá as instruções por email em até 2 horas úteis.",
+                        "Sua solicitação de redefinição de senha foi encaminhada para o suporte técnico. Você receberá um email com as instruções em breve."
+                    ],
+                    "sistema": [
+                        "Identificamos o problema relatado em nosso sistema. Nossa equipe técnica já foi notificada e está trabalhando na correção.",
+                        "Recebemos seu relato sobre o erro no sistema. O caso foi encaminhado para nossa equipe de desenvolvimento."
+                    ],
+                    "suporte": [
+                        "Sua solicitação foi registrada e encaminhada para nossa equipe de suporte. Um atendente entrará em contato em até 24 horas úteis.",
+                        "Recebemos sua mensagem e ela foi direcionada para o setor responsável. Nossa equipe retornará com uma solução em breve."
+                    ],
+                    "financeiro": [
+                        "Sua questão financeira foi encaminhada para nosso departamento financeiro. Você receberá um retorno dentro de 48 horas úteis.",
+                        "Recebemos sua solicitação financeira. Nossa equipe do setor financeiro analisará seu caso e entrará em contato."
+                    ],
+                    "treinamento": [
+                        "Sua solicitação de treinamento foi registrada. Nossa equipe de capacitação entrará em contato para agendar uma sessão.",
+                        "Recebemos sua necessidade de treinamento adicional. Um especialista da nossa equipe agendará um horário para te auxiliar."
+                    ],
+                    "generico": [
+                        "Sua mensagem foi recebida e direcionada para o setor apropriado. Retornaremos com uma resposta em até 24 horas úteis.",
+                        "Recebemos sua solicitação. Nossa equipe analisará seu caso e fornecerá uma resposta adequada em breve."
+                    ]
+                },
+                "Improdutivo": {
+                    "felicitacoes": [
+                        "Muito obrigado pelas felicitações! Desejamos o mesmo para você e sua família.",
+                        "Agradecemos as felicitações! Que seja um período de muita alegria e prosperidade."
+                    ],
+                    "pessoal": [
+                        "Obrigado pela mensagem! Desejo tudo de bom para você.",
+                        "Agradeço pelo contato. Tenha um excelente dia!"
+                    ],
+                    "generico": [
+                        "Obrigado pela mensagem!",
+                        "Agradeço pelo contato."
+                    ]
+                }
             }
-        }
 
-    def generate_response(self, email_text: str) -> Dict[str, Any]:
+            self._initialized = True
+
+    def generate_response(self, email: Union[str, PreprocessedText]) -> Dict[str, Any]:
         try:
-            classification = self.email_classifier.classify(email_text)
-            category = classification["category"]
-            confidence = classification["confidence"]
-
-            email_type = self._identify_email_type(email_text.lower(), category)
-            selected_response = self._select_template(category, email_type)
-
-            return {
-                "suggested_response": selected_response,
-                "category": category,
-                "confidence": round(confidence, 3),
-                "email_type": email_type,
-                "status": "success"
-            }
+            document = self._as_document(email)
+            # Inclui a espera pelo micro-lote
+            with stage("classify"):
+                classification = self.batcher.classify(document)
+            with stage("response"):
+                return self._build_response(document, classification)
 
         except Exception as e:
-            return {
-                "suggested_response": self._get_fallback_response(),
-                "category": "unknown",
-                "confidence": 0.0,
-                "email_type": "generico",
-                "status": "error",
-                "error": str(e)
-            }
+            return self._error_response(e)
 
-    def _identify_email_type(self, email_text: str, category: str) -> str:
-        if category == "Produtivo":
-            keywords = {
-                "senha": ["senha", "password", "login", "acesso", "entrar", "redefinir"],
-                "sistema": ["erro", "bug", "sistema", "falha", "problema", "não funciona", "500", "404"],
-                "suporte": ["suporte", "ajuda", "dúvida", "chat", "atendimento", "demora", "protocolo"],
-                "financeiro": ["financeiro", "pagamento", "fatura", "cobrança", "valor", "preço", "boleto"],
-                "treinamento": ["treinamento", "capacitação", "aprender", "tutorial", "ensinar", "adaptar", "funcionalidade"]
-            }
-            for email_type, words in keywords.items():
-                if any(word in email_text for word in words):
-                    return email_type
-        elif category == "Improdutivo":
-            felicitacao_words = ["feliz", "natal", "ano novo", "parabéns", "aniversário", "prospero", "festas"]
-            if any(word in email_text for word in felicitacao_words):
-                return "felicitacoes"
-            return "pessoal"
-        return "generico"
+    def generate_responses(self, emails: List[Union[str, PreprocessedText]]) -> List[Dict[str, Any]]:
+        # Classifica a lista inteira de uma vez (um único encode no classificador)
+        try:
+            documents = self._as_documents(emails)
+            classifications = self.email_classifier.classify_many(documents)
+        except Exception as e:
+            return [self._error_response(e) for _ in emails]
+
+        responses = []
+        with stage("response"):
+            for document, classification in zip(documents, classifications):
+                try:
+                    responses.append(self._build_response(document, classification))
+                except Exception as e:
+                    responses.append(self._error_response(e))
+        return responses
+
+    def _as_document(self, email: Union[str, PreprocessedText]) -> PreprocessedText:
+        # Texto cru passa pelo spaCy uma única vez aqui; documentos já prontos são reaproveitados
+        return email if isinstance(email, PreprocessedText) else analyze(email)
+
+    def _as_documents(self, emails: List[Union[str, PreprocessedText]]) -> List[PreprocessedText]:
+        # Os textos crus da lista passam juntos pelo spaCy (nlp.pipe)
+        raw = iter(analyze_many([email for email in emails if not isinstance(email, PreprocessedText)]))
+        return [email if isinstance(email, PreprocessedText) else next(raw) for email in emails]
+
+    def _build_response(self, document: PreprocessedText, classification: Dict[str, Any]) -> Dict[str, Any]:
+        category = classification["category"]
+        confidence = classification["confidence"]
+
+        matches = self.match_email_types(document.text, category)
+        email_type = self._identify_email_type(document.text, category, matches)
+        nearest = self._nearest_template(category, email_type, classification.get("embedding"))
+        selected_response = nearest if nearest is not None else self._select_template(category, email_type)
+
+        return {
+            "suggested_response": selected_response,
+            "category": category,
+            "confidence": round(confidence, 3),
+            "email_type": email_type,
+            "matched_types": [{"type": t, "score": score} for t, score in matches],
+            # "embedding": o mesmo email sempre recebe o mesmo template; "random": sorteado
+            "template_selection": "embedding" if nearest is not None else "random",
+            "status": "success"
+        }
+
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        return {
+            "suggested_response": self._get_fallback_response(),
+            "category": "unknown",
+            "confidence": 0.0,
+            "email_type": "generico",
+            "status": "error",
+            "error": str(error)
+        }
+
+    def match_email_types(self, email_text: str, category: str) -> List[Tuple[str, int]]:
+        entry = self.type_matchers.get(category)
+        return entry[0].match(email_text) if entry else []
+
+    def _identify_email_type(self, email_text: str, category: str, matches: List[Tuple[str, int]] = None) -> str:
+        # Tipo com mais palavras-chave encontradas; empate fica com a ordem do arquivo
+        entry = self.type_matchers.get(category)
+        if entry is None:
+            return "generico"
+        if matches is None:
+            matches = entry[0].match(email_text)
+        return matches[0][0] if matches else entry[1]
+
+    def select_response(self, category: str, email_type: str) -> str:
+        return self._select_template(category, email_type)
+
+    @property
+    def template_index(self) -> TemplateIndex:
+        if self._template_index is None:
+            with self._template_lock:
+                if self._template_index is None:
+                    self._template_index = TemplateIndex(self.response_templates, self.email_classifier.encode)
+        return self._template_index
+
+    def _nearest_template(self, category: str, email_type: str, embedding=None) -> Optional[str]:
+        # Template mais próximo do email; None sem embedding ou com TEMPLATE_SELECTION=random
+        if embedding is None or TEMPLATE_SELECTION != "embedding":
+            return None
+        return self.template_index.select(category, email_type, embedding)
+
+    def _select_template(self, category: str, email_type: str, embedding=None) -> str:
+        # Template mais próximo do email; sem ele, sorteia no tipo
+        selected = self._nearest_template(category, email_type, embedding)
+        if selected is not None:
+            return selected
 
-    def _select_template(self, category: str, email_type: str) -> str:
         if category in self.response_templates:
             category_templates = self.response_templates[category]
             if email_type in category_templates:
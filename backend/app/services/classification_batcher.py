@@ -0,0 +1,128 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Any, List, Tuple, Union
+from app.services.email_classifier import EmailClassifier
+from app.services.metrics import add_timings, capture, observe_batch
+from app.utils.preprocessor_npl import PreprocessedText
+
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "true").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "5"))
+
+
+class ClassificationBatcher:
+    # Agrupa chamadas concorrentes de classify em um único classify_many.
+    # O lote é disparado ao atingir max_batch_size itens ou quando o primeiro
+    # item esperou max_wait_ms, o que limita a latência extra por chamada.
+    _instance = None  # Singleton
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, max_batch_size: int = MICROBATCH_MAX_SIZE, max_wait_ms: float = MICROBATCH_MAX_WAIT_MS):
+        if hasattr(self, "_initialized") and self._initialized:
+            return
+        self._initialized = True
+
+        self._classifier = None
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[Tuple[Union[str, PreprocessedText], Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        # Métricas
+        self._batches = 0
+        self._items = 0
+        self._last_batch_size = 0
+        self._max_batch_seen = 0
+        self._batch_size_histogram: Dict[int, int] = {}
+
+    @property
+    def email_classifier(self) -> EmailClassifier:
+        # Só carrega o modelo na primeira classificação (as métricas não precisam dele)
+        if self._classifier is None:
+            self._classifier = EmailClassifier()
+        return self._classifier
+
+    def classify(self, text: Union[str, PreprocessedText]) -> Dict[str, Any]:
+        if not MICROBATCH_ENABLED:
+            return self.email_classifier.classify(text)
+
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        result, timings = future.result()
+        # Etapas do lote (encode, predict) medidas na thread do batcher
+        add_timings(timings)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": MICROBATCH_ENABLED,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 3) if self._batches else 0.0,
+                "last_batch_size": self._last_batch_size,
+                "max_batch_size_seen": self._max_batch_seen,
+                "batch_size_histogram": dict(sorted(self._batch_size_histogram.items())),
+            }
+
+    def _ensure_worker(self):
+        # A thread só é criada no primeiro uso
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="classification-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect_batch(self) -> List[Tuple[Union[str, PreprocessedText], Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+
+            try:
+                with capture() as timings:
+                    results = self.email_classifier.classify_many(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result((result, timings))
+
+            self._record(len(batch))
+
+    def _record(self, size: int):
+        observe_batch("microbatch", size)
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._last_batch_size = size
+            self._max_batch_seen = max(self._max_batch_seen, size)
+            self._batch_size_histogram[size] = self._batch_size_histogram.get(size, 0) + 1
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.training_data import EXAMPLES
+from app.utils.preprocessor_npl import pipeline_config, preprocess_many
+
+# scikit-learn só é importado quando um artefato é treinado ou carregado
+if TYPE_CHECKING:
+    from sklearn.linear_model import LogisticRegression
+
+EMBEDDING_MODEL_ID = "all-MiniLM-L6-v2"
+LABELS = {0: "Produtivo", 1: "Improdutivo"}
+
+# Incrementar quando o formato do arquivo ou o pré-processamento mudar
+ARTIFACT_FORMAT = 2
+
+MODEL_DIR = os.getenv(
+    "MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "artifacts"),
+)
+
+
+def training_data_hash(examples=EXAMPLES, embedding_model_id: str = EMBEDDING_MODEL_ID) -> str:
+    payload = json.dumps(
+        {
+            "format": ARTIFACT_FORMAT,
+            "model": embedding_model_id,
+            "preprocessing": pipeline_config(),
+            "examples": [list(e) for e in examples],
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def train(encode: Callable[[List[str]], np.ndarray], examples=EXAMPLES) -> "LogisticRegression":
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+
+    texts, labels = zip(*examples)
+    processed_texts = list(preprocess_many(texts))
+    embeddings = encode(processed_texts)
+
+    # Treino/teste
+    X_train, X_test, y_train, y_test = train_test_split(
+        embeddings, labels, test_size=0.2, random_state=42
+    )
+
+    # Treinar classificador
+    clf = LogisticRegression()
+    clf.fit(X_train, y_train)
+    return clf
+
+
+def save_artifact(clf: "LogisticRegression", data_hash: str, embedding_model_id: str = EMBEDDING_MODEL_ID) -> Dict[str, Any]:
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    version = data_hash[:12]
+    metadata = {
+        "format": ARTIFACT_FORMAT,
+        "version": version,
+        "data_hash": data_hash,
+        "embedding_model": embedding_model_id,
+        "label_map": {str(k): v for k, v in LABELS.items()},
+        "n_features": int(clf.coef_.shape[1]),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+    # Escreve em arquivos temporários e renomeia: workers concorrentes nunca leem um artefato pela metade
+    weights_path = _path(version, "npz")
+    tmp_weights = weights_path + f".{os.getpid()}.tmp"
+    with open(tmp_weights, "wb") as f:
+        np.savez(f, coef=clf.coef_, intercept=clf.intercept_, classes=clf.classes_)
+    os.replace(tmp_weights, weights_path)
+
+    meta_path = _path(version, "json")
+    tmp_meta = meta_path + f".{os.getpid()}.tmp"
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_meta, meta_path)
+
+    return metadata
+
+
+def load_artifact(data_hash: str) -> Optional[Tuple["LogisticRegression", Dict[str, Any]]]:
+    from sklearn.linear_model import LogisticRegression
+
+    version = data_hash[:12]
+    meta_path, weights_path = _path(version, "json"), _path(version, "npz")
+    if not (os.path.exists(meta_path) and os.path.exists(weights_path)):
+        return None
+
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            metadata = json.load(f)
+        if metadata.get("format") != ARTIFACT_FORMAT or metadata.get("data_hash") != data_hash:
+            return None
+
+        with np.load(weights_path) as weights:
+            clf = LogisticRegression()
+            clf.coef_ = weights["coef"]
+            clf.intercept_ = weights["intercept"]
+            clf.classes_ = weights["classes"]
+            clf.n_features_in_ = clf.coef_.shape[1]
+        return clf, metadata
+    except Exception as e:
+        print(f"Erro ao carregar artefato do classificador: {e}")
+        return None
+
+
+def load_or_train(encode: Callable[[List[str]], np.ndarray], embedding_model_id: str = EMBEDDING_MODEL_ID, force: bool = False) -> Tuple["LogisticRegression", Dict[str, Any]]:
+    # Só treina de novo quando o hash dos dados (ou o modelo de embedding) muda
+    data_hash = training_data_hash(EXAMPLES, embedding_model_id)
+    if not force:
+        loaded = load_artifact(data_hash)
+        if loaded is not None:
+            return loaded
+
+    clf = train(encode)
+    try:
+        metadata = save_artifact(clf, data_hash, embedding_model_id)
+    except OSError as e:
+        # Sem permissão de escrita o serviço continua com o modelo em memória
+        print(f"Erro ao salvar artefato do classificador: {e}")
+        metadata = {"format": ARTIFACT_FORMAT, "version": data_hash[:12], "data_hash": data_hash,
+                    "embedding_model": embedding_model_id}
+    return clf, metadata
+
+
+def _path(version: str, extension: str) -> str:
+    return os.path.join(MODEL_DIR, f"classifier-{version}.{extension}")
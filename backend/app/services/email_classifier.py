@@ -1,12 +1,17 @@
-from sentence_transformers import SentenceTransformer
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from app.utils.training_data import EXAMPLES
-from app.utils.preprocessor_npl import preprocess
+import threading
+from typing import List, Dict, Any, Union
+import numpy as np
+from app.services.classifier_artifact import LABELS, load_or_train
+from app.services.encoder_backends import load_encoder
+from app.services.embedding_store import open_embedding_store
+from app.services.text_chunker import CHUNK_POOLING, chunk_text, pool
+from app.services.metrics import observe_batch, stage
+from app.utils.preprocessor_npl import preprocess_many, PreprocessedText
 
 class EmailClassifier:
     # INSTÂNCIA ÚNICA para toda aplicação
     _instance = None
+    _init_lock = threading.Lock()  # warm-up e primeira requisição podem chegar juntos
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
@@ -14,34 +19,99 @@ class EmailClassifier:
         return cls._instance
 
     def __init__(self):
-        if hasattr(self, "clf"):
-            return 
+        with EmailClassifier._init_lock:
+            if hasattr(self, "clf"):
+                return
+            self._load()
 
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+    @classmethod
+    def is_loaded(cls) -> bool:
+        return cls._instance is not None and hasattr(cls._instance, "clf")
 
-        texts, labels = zip(*EXAMPLES)
-        processed_texts = [preprocess(t) for t in texts]
-        embeddings = self.embedding_model.encode(processed_texts)
+    def _load(self):
+        # Backend do encoder (torch, onnx ou onnx-int8) definido por ENCODER_BACKEND
+        self.encoder = load_encoder()
+        self.embedding_store = open_embedding_store(self.encoder.model_id, self.encoder.dimension)
 
-        # 3. Treino/teste
-        X_train, X_test, y_train, y_test = train_test_split(
-            embeddings, labels, test_size=0.2, random_state=42
-        )
+        # Carrega o artefato versionado; só treina se os dados de treino mudaram
+        # (os exemplos de treino vão para o store na hora, com fsync)
+        clf, metadata = load_or_train(lambda texts: self.encode(texts, durable=True), self.encoder.model_id)
+        self.base_version = metadata["version"]  # artefato sem as atualizações online
+        self.artifact_version = metadata["version"]
+        self.clf = clf
 
-        # 4. Treinar classificador
-        self.clf = LogisticRegression()
-        self.clf.fit(X_train, y_train)
+    def encode(self, texts: List[str], durable: bool = False) -> np.ndarray:
+        # Textos já vistos (treino ou emails anteriores) saem do store sem passar pelo modelo
+        if self.embedding_store is None:
+            return self.encoder.encode(list(texts))
+        return self.embedding_store.encode(texts, self.encoder.encode, durable)
 
-    def classify(self, text):
-        processed_text = preprocess(text)
-        emb = self.embedding_model.encode([processed_text])
-        pred = self.clf.predict(emb)[0]
-        proba = self.clf.predict_proba(emb)[0]
-        confidence = max(proba)
+    @classmethod
+    def flush_embeddings(cls):
+        # Encerramento do processo: grava os embeddings que ainda estão em memória
+        if cls.is_loaded() and cls._instance.embedding_store is not None:
+            cls._instance.embedding_store.flush()
 
-        category = "Improdutivo" if pred == 1 else "Produtivo"
+    def swap(self, clf, version: str):
+        # Troca o modelo em uso sem pausar o tráfego: cada classificação lê self.clf
+        # uma única vez, então as que estão em andamento terminam com o anterior.
+        # A versão nova invalida o cache de resultados.
+        self.clf = clf
+        self.artifact_version = version
 
-        return {
-            "category": category,
-            "confidence": float(confidence)
-        }
+    def embed(self, texts: List[str], clf=None) -> np.ndarray:
+        # Emails maiores que a janela do modelo viram várias janelas de tokens;
+        # todas as janelas de todos os emails vão numa única chamada ao encoder
+        # e depois são agrupadas num embedding por email (em vez do truncamento
+        # silencioso do encoder, que ignorava tudo depois dos primeiros tokens)
+        window = self.encoder.max_length - 2  # [CLS] e [SEP]
+        chunks = [chunk_text(text, self.encoder.tokenizer, window) for text in texts]
+        if all(len(c) == 1 for c in chunks):
+            return self.encode(texts)
+
+        flat = np.asarray(self.encode([c for text_chunks in chunks for c in text_chunks]))
+        # Ponderação pela confiança do classificador em cada janela
+        confidences = (clf if clf is not None else self.clf).predict_proba(flat).max(axis=1) if CHUNK_POOLING == "confidence" else None
+
+        pooled, start = [], 0
+        for text_chunks in chunks:
+            end = start + len(text_chunks)
+            pooled.append(pool(flat[start:end], weights=None if confidences is None else confidences[start:end]))
+            start = end
+        return np.vstack(pooled)
+
+    def classify(self, text: Union[str, PreprocessedText]):
+        return self.classify_many([text])[0]
+
+    def classify_many(self, texts: List[Union[str, PreprocessedText]]) -> List[Dict[str, Any]]:
+        if not texts:
+            return []
+
+        # Uma única chamada ao encoder e ao classificador para a lista inteira.
+        # Documentos já pré-processados não passam pelo spaCy de novo.
+        observe_batch("classify", len(texts))
+        clf = self.clf
+        raw_texts = [t for t in texts if not isinstance(t, PreprocessedText)]
+        raw = iter(())
+        if raw_texts:
+            with stage("preprocess"):
+                raw = iter(list(preprocess_many(raw_texts)))
+        processed_texts = [
+            t.lemmatized if isinstance(t, PreprocessedText) else next(raw)
+            for t in texts
+        ]
+        with stage("encode"):
+            embeddings = self.embed(processed_texts, clf)
+        with stage("predict"):
+            probas = clf.predict_proba(embeddings)
+
+        results = []
+        for proba, embedding in zip(probas, embeddings):
+            pred = clf.classes_[proba.argmax()]
+            category = LABELS.get(int(pred), "Produtivo")
+            results.append({
+                "category": category,
+                "confidence": float(max(proba)),
+                "embedding": embedding,  # reaproveitado na escolha do template de resposta
+            })
+        return results
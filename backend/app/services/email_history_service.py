@@ -1,42 +1,363 @@
+import base64
+import os
+from sqlalchemy import and_, or_, func, select, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from app.models.email_history import EmailHistory
-from datetime import datetime
+from app.models.email_stats import EmailStats
+from app.models.training_example import TrainingExample
+from app.services.metrics import timed
+from app.utils.preprocessor_npl import preprocess
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+STATS_TABLE_ENABLED = os.getenv("STATS_TABLE_ENABLED", "false").lower() == "true"
+
+# Colunas devolvidas pelas listagens (evita carregar entidades inteiras)
+HISTORY_COLUMNS = (
+    EmailHistory.id,
+    EmailHistory.text_preview,
+    EmailHistory.category,
+    EmailHistory.ai_confidence,
+    EmailHistory.response_preview,
+    EmailHistory.analyzed_at,
+    EmailHistory.email_type,
+)
+
+
+def encode_cursor(analyzed_at: datetime, email_id: int) -> str:
+    raw = f"{analyzed_at.isoformat()}|{email_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        analyzed_at, email_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(analyzed_at), int(email_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def ticket_statement(ticket: str):
+    return select(*HISTORY_COLUMNS).where(EmailHistory.ticket == ticket).limit(1)
+
+
+def filtered_select(
+    category: Optional[str] = None,
+    email_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    min_confidence: Optional[float] = None,
+    max_confidence: Optional[float] = None,
+):
+    stmt = select(*HISTORY_COLUMNS)
+    if category is not None:
+        stmt = stmt.where(EmailHistory.category == category)
+    if email_type is not None:
+        stmt = stmt.where(EmailHistory.email_type == email_type)
+    if date_from is not None:
+        stmt = stmt.where(EmailHistory.analyzed_at >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(EmailHistory.analyzed_at <= date_to)
+    if min_confidence is not None:
+        stmt = stmt.where(EmailHistory.ai_confidence >= min_confidence)
+    if max_confidence is not None:
+        stmt = stmt.where(EmailHistory.ai_confidence <= max_confidence)
+    return stmt
+
+
+def list_statement(limit: int, cursor: Optional[str] = None, **filters):
+    # Paginação por cursor (keyset) em (analyzed_at, id), do mais recente para o mais antigo
+    stmt = filtered_select(**filters)
+    if cursor:
+        cursor_at, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            EmailHistory.analyzed_at < cursor_at,
+            and_(EmailHistory.analyzed_at == cursor_at, EmailHistory.id < cursor_id),
+        ))
+    # Uma linha a mais indica se existe próxima página
+    return stmt.order_by(EmailHistory.analyzed_at.desc(), EmailHistory.id.desc()).limit(limit + 1)
+
+
+def build_page(rows, limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].analyzed_at, rows[-1].id)
+    return [EmailHistory.format_row(row) for row in rows], next_cursor
+
+
+def count_statement():
+    if STATS_TABLE_ENABLED:
+        return (
+            select(EmailStats.category, EmailStats.email_type,
+                   func.sum(EmailStats.count), func.sum(EmailStats.confidence_sum))
+            .group_by(EmailStats.category, EmailStats.email_type)
+        )
+    return (
+        select(EmailHistory.category, EmailHistory.email_type,
+               func.count(EmailHistory.id), func.coalesce(func.sum(EmailHistory.ai_confidence), 0.0))
+        .group_by(EmailHistory.category, EmailHistory.email_type)
+    )
+
+
+def summarize_counts(rows) -> Dict[str, Any]:
+    total, confidence_sum = 0, 0.0
+    by_category: Dict[str, int] = {}
+    by_email_type: Dict[str, int] = {}
+    for category, email_type, count, conf_sum in rows:
+        total += count
+        confidence_sum += conf_sum or 0.0
+        by_category[category] = by_category.get(category, 0) + count
+        by_email_type[email_type or "text"] = by_email_type.get(email_type or "text", 0) + count
+
+    return {
+        "total": total,
+        "produtivo": by_category.get("Produtivo", 0),
+        "improdutivo": by_category.get("Improdutivo", 0),
+        "by_email_type": by_email_type,
+        "avg_confidence": round(confidence_sum / total, 3) if total else None,
+    }
+
+
+def series_statement(days: int, category: Optional[str] = None):
+    start = date.today() - timedelta(days=days - 1)
+    if STATS_TABLE_ENABLED:
+        day_column = EmailStats.day
+        stmt = (
+            select(day_column, EmailStats.category,
+                   func.sum(EmailStats.count), func.sum(EmailStats.confidence_sum))
+            .where(EmailStats.day >= start)
+        )
+        if category is not None:
+            stmt = stmt.where(EmailStats.category == category)
+        return stmt.group_by(day_column, EmailStats.category), start
+
+    day_column = func.date(EmailHistory.analyzed_at)
+    stmt = (
+        select(day_column, EmailHistory.category,
+               func.count(EmailHistory.id), func.coalesce(func.sum(EmailHistory.ai_confidence), 0.0))
+        .where(EmailHistory.analyzed_at >= datetime.combine(start, datetime.min.time()))
+    )
+    if category is not None:
+        stmt = stmt.where(EmailHistory.category == category)
+    return stmt.group_by(day_column, EmailHistory.category), start
+
+
+def summarize_series(rows, start: date, days: int) -> List[Dict[str, Any]]:
+    # Série diária para gráficos; dias sem emails aparecem zerados
+    series = {
+        (start + timedelta(days=i)).isoformat(): {"total": 0, "produtivo": 0, "improdutivo": 0, "confidence_sum": 0.0}
+        for i in range(days)
+    }
+    for day, row_category, count, conf_sum in rows:
+        # SQLite devolve a data como texto, PostgreSQL como date
+        key = day if isinstance(day, str) else day.isoformat()
+        bucket = series.get(key)
+        if bucket is None:
+            continue
+        bucket["total"] += count
+        bucket["confidence_sum"] += conf_sum or 0.0
+        if row_category == "Produtivo":
+            bucket["produtivo"] += count
+        elif row_category == "Improdutivo":
+            bucket["improdutivo"] += count
+
+    return [
+        {
+            "day": day,
+            "total": bucket["total"],
+            "produtivo": bucket["produtivo"],
+            "improdutivo": bucket["improdutivo"],
+            "avg_confidence": round(bucket["confidence_sum"] / bucket["total"], 3) if bucket["total"] else None,
+        }
+        for day, bucket in series.items()
+    ]
+
 
 class EmailHistoryService:
     def __init__(self, db: Session):
         self.db = db
     
+    @timed("db_save")
     def save_email(self, email_data):
+        new_email = self._build_history(email_data)
+        
+        self.db.add(new_email)
+        self.db.flush()
+        self._update_stats([new_email])
+        self.db.commit()
+        self.db.refresh(new_email)
+        
+        return new_email
+    
+    @timed("db_save")
+    def save_emails(self, emails_data, commit: bool = True):
+        # Insert em lote: um único flush/commit para a lista inteira
+        # (commit=False: quem chamou fecha a transação junto com outras gravações)
+        new_emails = [self._build_history(email_data) for email_data in emails_data]
+        
+        self.db.add_all(new_emails)
+        self.db.flush()
+        # Lê os ids antes do commit para evitar um SELECT por linha depois dele
+        saved_ids = [email.id for email in new_emails]
+        self._update_stats(new_emails)
+        if commit:
+            self.db.commit()
+        
+        return saved_ids
+    
+    def _build_history(self, email_data):
         text_preview = email_data["raw_content"][:200] if email_data.get("raw_content") else ""
         response_preview = email_data["suggested_response"][:200] if email_data.get("suggested_response") else ""
         
-        new_email = EmailHistory(
+        return EmailHistory(
             text_preview=text_preview,
             category=email_data.get("category", "unknown"),
             ai_confidence=email_data.get("confidence", 0.0),
             response_preview=response_preview,
             email_type=email_data.get("input_type", "text"),
-            analyzed_at=datetime.now()
+            analyzed_at=email_data.get("analyzed_at") or datetime.now(),
+            ticket=email_data.get("ticket"),
+            processed_content=email_data.get("processed_content")
         )
-        
-        self.db.add(new_email)
-        self.db.commit()
-        self.db.refresh(new_email)
-        
-        return new_email
     
-    def get_all_emails(self):
-        # Buscar todos os emails no banco de dados
-        return self.db.query(EmailHistory).all()
+    @timed("db_ticket")
+    def get_by_ticket(self, ticket: str) -> Optional[Dict[str, Any]]:
+        row = self.db.execute(ticket_statement(ticket)).first()
+        return EmailHistory.format_row(row) if row else None
     
-    def get_emails_by_category(self, category: str):
-        # Buscar emails por categoria
-        return self.db.query(EmailHistory).filter(EmailHistory.category == category).all()
+    @timed("db_list")
+    def list_emails(self, limit: int = 100, cursor: Optional[str] = None, **filters) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        rows = self.db.execute(list_statement(limit, cursor, **filters)).all()
+        return build_page(rows, limit)
+
+    def stream_emails(self, batch_size: int = 1000, **filters):
+        # Cursor do lado do servidor: memória constante, independente do tamanho da tabela
+        stmt = (
+            filtered_select(**filters)
+            .order_by(EmailHistory.analyzed_at.desc(), EmailHistory.id.desc())
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        for row in self.db.execute(stmt):
+            yield EmailHistory.format_row(row)
     
+    @timed("db_count")
     def count_emails(self):
-        # Contar emails por categoria
-        return {
-            "total": self.db.query(EmailHistory).count(),
-            "produtivo": self.db.query(EmailHistory).filter(EmailHistory.category == "Produtivo").count(),
-            "improdutivo": self.db.query(EmailHistory).filter(EmailHistory.category == "Improdutivo").count(),
-        }
+        # Uma única consulta agrupada (na tabela pré-agregada, quando ativa)
+        return summarize_counts(self.db.execute(count_statement()).all())
+
+    @timed("db_series")
+    def stats_series(self, days: int = 30, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        stmt, start = series_statement(days, category)
+        return summarize_series(self.db.execute(stmt).all(), start, days)
+
+    def correct_category(self, email_id: int, category: str, text: Optional[str] = None) -> Optional[Tuple[Dict[str, Any], TrainingExample]]:
+        # Corrige a categoria de um email do histórico e grava o exemplo de treino,
+        # na mesma transação. Sem o texto pré-processado (linhas antigas), usa o texto enviado.
+        email = self.db.get(EmailHistory, email_id, with_for_update=True)
+        if email is None:
+            return None
+
+        if text:
+            email.processed_content = preprocess(text)
+        processed = email.processed_content
+        if not processed:
+            raise ValueError("Texto do email não está no histórico; envie o campo text")
+
+        previous = email.category
+        if previous != category:
+            self._update_stats([email], sign=-1)
+            email.category = category
+            self._update_stats([email])
+
+        example = TrainingExample(history_id=email.id, text=processed, label=category, previous_label=previous)
+        self.db.add(example)
+        self.db.commit()
+        self.db.refresh(email)
+        self.db.refresh(example)
+        return email.to_dict(), example
+
+    def rebuild_stats(self, only_if_empty: bool = False):
+        # Recalcula a tabela pré-agregada inteira a partir do histórico, num único INSERT ... SELECT
+        if only_if_empty and self.db.query(EmailStats.day).first() is not None:
+            return
+
+        day = func.date(EmailHistory.analyzed_at)
+        email_type = func.coalesce(EmailHistory.email_type, "text")
+        aggregated = (
+            select(day, EmailHistory.category, email_type,
+                   func.count(EmailHistory.id), func.coalesce(func.sum(EmailHistory.ai_confidence), 0.0))
+            .where(EmailHistory.analyzed_at.isnot(None))
+            .group_by(day, EmailHistory.category, email_type)
+        )
+
+        self.db.query(EmailStats).delete()
+        self.db.execute(insert(EmailStats).from_select(
+            ["day", "category", "email_type", "count", "confidence_sum"], aggregated
+        ))
+        self.db.commit()
+
+    def _update_stats(self, emails: List[EmailHistory], sign: int = 1):
+        # sign=-1 desconta os emails (ex.: antes de mudar a categoria)
+        if not STATS_TABLE_ENABLED:
+            return
+
+        buckets: Dict[Tuple[date, str, str], List] = {}
+        for email in emails:
+            key = (email.analyzed_at.date(), email.category, email.email_type or "text")
+            bucket = buckets.setdefault(key, [0, 0.0])
+            bucket[0] += sign
+            bucket[1] += sign * (email.ai_confidence or 0.0)
+
+        rows = [
+            {"day": day, "category": category, "email_type": email_type, "count": count, "confidence_sum": conf_sum}
+            for (day, category, email_type), (count, conf_sum) in buckets.items()
+        ]
+
+        # Upsert na mesma transação do insert no histórico
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            stmt = dialect_insert(EmailStats).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["day", "category", "email_type"],
+                set_={
+                    "count": EmailStats.count + stmt.excluded["count"],
+                    "confidence_sum": EmailStats.confidence_sum + stmt.excluded.confidence_sum,
+                },
+            )
+            self.db.execute(stmt)
+            return
+
+        for row in rows:
+            key = (row["day"], row["category"], row["email_type"])
+            existing = self.db.get(EmailStats, key, with_for_update=True)
+            if existing is None:
+                self.db.add(EmailStats(**row))
+            else:
+                existing.count += row["count"]
+                existing.confidence_sum += row["confidence_sum"]
+
+
+class AsyncEmailHistoryService:
+    # Mesmas consultas de leitura do EmailHistoryService sobre uma AsyncSession
+    def __init__(self, db):
+        self.db = db
+
+    async def get_by_ticket(self, ticket: str) -> Optional[Dict[str, Any]]:
+        row = (await self.db.execute(ticket_statement(ticket))).first()
+        return EmailHistory.format_row(row) if row else None
+
+    async def list_emails(self, limit: int = 100, cursor: Optional[str] = None, **filters) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        rows = (await self.db.execute(list_statement(limit, cursor, **filters))).all()
+        return build_page(rows, limit)
+
+    async def count_emails(self):
+        return summarize_counts((await self.db.execute(count_statement())).all())
+
+    async def stats_series(self, days: int = 30, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        stmt, start = series_statement(days, category)
+        return summarize_series((await self.db.execute(stmt)).all(), start, days)
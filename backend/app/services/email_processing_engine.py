@@ -1,57 +1,159 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Union, BinaryIO
 import os
 from app.services.ai_response_generator import AIResponseGenerator
 from app.services.email_history_service import EmailHistoryService
+from app.services.result_cache import ResultCache
+from app.services.history_writer import HistoryWriter, HISTORY_WRITE_BEHIND
 from app.utils.read_pdf import read_pdf
 from app.utils.read_txt import read_txt
-from app.utils.preprocessor_npl import preprocess
+from app.utils.preprocessor_npl import analyze, analyze_many
+from app.services.metrics import observe_batch, stage
 from sqlalchemy.orm import Session
 
 
 class EmailProcessingEngine:
-    def __init__(self, db: Optional[Session] = None):
+    # Sem estado por requisição: a sessão do banco é passada em cada chamada
+    def __init__(self):
         self.response_generator = AIResponseGenerator()
-        self.db = db
+        self.result_cache = ResultCache()
         
-    def process_email(self, input_data: str, input_type: str = "text") -> Dict[str, Any]:
+    def process_email(self, input_data: Union[str, bytes, BinaryIO], input_type: str = "text", db: Optional[Session] = None) -> Dict[str, Any]:
         try:
             # 1. Ler o arquivo
-            content = self._read_content(input_data, input_type)
+            with stage("read"):
+                content = self._read_content(input_data, input_type)
             
-            # 2. Processar texto
-            processed = preprocess(content)
+            # 2. Conteúdo repetido: reaproveita a classificação já feita
+            version = self._classifier_version()
+            cached = self.result_cache.get(content, version)
+            if cached is not None:
+                result = self._build_cached_result(content, cached, input_type)
+            else:
+                # 3. Processar texto (uma única passada do spaCy, reaproveitada no resto do pipeline)
+                with stage("preprocess"):
+                    document = analyze(content)
+                
+                # 4. Gerar resposta
+                response = self.response_generator.generate_response(document)
+                
+                # 5. Montar resultado
+                result = self._build_result(content, document.lemmatized, response, input_type)
+                self._cache_result(content, version, result, response)
             
-            # 3. Gerar resposta
-            response = self.response_generator.generate_response(processed)
-            
-            # 4. Montar resultado
-            result = {
-                "status": "success",
-                "raw_content": content,
-                "processed_content": processed,
-                "category": response["category"],
-                "confidence": float(response["confidence"]),  # Converter para float Python
-                "email_type": response["email_type"],
-                "suggested_response": response["suggested_response"],
-                "input_type": input_type
-            }
-            
-            if self.db:
-                history_service = EmailHistoryService(self.db)
+            if HISTORY_WRITE_BEHIND:
+                # Não espera o commit: o ticket identifica a linha quando ela for gravada
+                result["history_ticket"] = HistoryWriter().submit(result)
+            elif db:
+                history_service = EmailHistoryService(db)
                 saved = history_service.save_email(result)
                 result["saved_id"] = saved.id
             
             return result
             
         except Exception as e:
-            return {
-                "status": "error",
-                "error": str(e),
-                "suggested_response": "Obrigado pelo contato."
-            }
+            return self._error_result(e)
+
+    def process_emails(self, inputs: List[Union[str, bytes, BinaryIO]], input_type: str = "text", db: Optional[Session] = None,
+                       save_history: bool = True, write_behind: Optional[bool] = None, commit: bool = True) -> List[Dict[str, Any]]:
+        # write_behind=False força o insert na hora mesmo com HISTORY_WRITE_BEHIND;
+        # commit=False deixa o insert na transação de quem chamou (ex.: jobs)
+        if write_behind is None:
+            write_behind = HISTORY_WRITE_BEHIND
+        results: List[Optional[Dict[str, Any]]] = [None] * len(inputs)
+        observe_batch("process_emails", len(inputs))
+        contents, positions = [], []
+        version = self._classifier_version()
+
+        # 1. Ler cada item; falhas individuais não derrubam o lote
+        for i, input_data in enumerate(inputs):
+            try:
+                with stage("read"):
+                    content = self._read_content(input_data, input_type)
+                cached = self.result_cache.get(content, version)
+                if cached is not None:
+                    results[i] = self._build_cached_result(content, cached, input_type)
+                    continue
+                contents.append(content)
+                positions.append(i)
+            except Exception as e:
+                results[i] = self._error_result(e)
+
+        # Pré-processa o que não estava no cache de uma vez (nlp.pipe)
+        with stage("preprocess"):
+            documents = list(analyze_many(contents))
+
+        # 2. Classificar de uma vez só o que não estava no cache
+        responses = self.response_generator.generate_responses(documents)
+
+        for i, content, document, response in zip(positions, contents, documents, responses):
+            results[i] = self._build_result(content, document.lemmatized, response, input_type)
+            self._cache_result(content, version, results[i], response)
+
+        # save_history=False (ex.: importação em dry-run): só classifica
+        batch = [result for result in results if result.get("status") == "success"] if save_history else []
+
+        # 3. Salvar todo o histórico em um único insert
+        if write_behind and batch:
+            tickets = HistoryWriter().submit_many(batch)
+            for result, ticket in zip(batch, tickets):
+                result["history_ticket"] = ticket
+        elif db and batch:
+            history_service = EmailHistoryService(db)
+            saved_ids = history_service.save_emails(batch, commit=commit)
+            for result, saved_id in zip(batch, saved_ids):
+                result["saved_id"] = saved_id
+
+        return results
+
+    def _classifier_version(self) -> str:
+        return self.response_generator.email_classifier.artifact_version
+
+    def _cache_result(self, content: str, version: str, result: Dict[str, Any], response: Dict[str, Any]):
+        # Falhas de classificação não entram no cache
+        if response.get("status") != "success":
+            return
+        value = {
+            "processed_content": result["processed_content"],
+            "category": result["category"],
+            "confidence": result["confidence"],
+            "email_type": result["email_type"],
+            "matched_types": result["matched_types"],
+        }
+        # A resposta só vai junto quando veio do template mais próximo (sempre a mesma
+        # para o email); se foi sorteada, cada acerto no cache sorteia de novo
+        if response.get("template_selection") == "embedding":
+            value["suggested_response"] = result["suggested_response"]
+        self.result_cache.put(content, version, value)
+
+    def _build_cached_result(self, content: str, cached: Dict[str, Any], input_type: str) -> Dict[str, Any]:
+        response = dict(cached)
+        if "suggested_response" not in response:
+            response["suggested_response"] = self.response_generator.select_response(cached["category"], cached["email_type"])
+        return self._build_result(content, cached["processed_content"], response, input_type)
+
+    def _build_result(self, content: str, processed: str, response: Dict[str, Any], input_type: str) -> Dict[str, Any]:
+        return {
+            "status": "success",
+            "raw_content": content,
+            "processed_content": processed,
+            "category": response["category"],
+            "confidence": float(response["confidence"]),  # Converter para float Python
+            "email_type": response["email_type"],
+            "matched_types": response.get("matched_types", []),
+            "suggested_response": response["suggested_response"],
+            "input_type": input_type
+        }
+
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        return {
+            "status": "error",
+            "error": str(error),
+            "suggested_response": "Obrigado pelo contato."
+        }
     
-    def _read_content(self, input_data: str, input_type: str) -> str:
-        if input_type == "text":
+    def _read_content(self, input_data: Union[str, bytes, BinaryIO], input_type: str) -> str:
+        if input_type in ("text", "email"):
+            # "email": texto já extraído de uma mensagem importada da caixa de email
             return input_data
         elif input_type == "pdf":
             return read_pdf(input_data)
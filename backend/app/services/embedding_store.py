@@ -0,0 +1,245 @@
+import hashlib
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from app.services.classifier_artifact import MODEL_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "true").lower() == "true"
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", os.path.join(MODEL_DIR, "embeddings"))
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+EMBEDDING_STORE_MAX_ROWS = int(os.getenv("EMBEDDING_STORE_MAX_ROWS", "1000000"))
+# Vetores das requisições são gravados em lote por uma thread (por tamanho ou intervalo)
+EMBEDDING_STORE_FLUSH_SIZE = int(os.getenv("EMBEDDING_STORE_FLUSH_SIZE", "256"))
+EMBEDDING_STORE_FLUSH_INTERVAL_SECONDS = float(os.getenv("EMBEDDING_STORE_FLUSH_INTERVAL_SECONDS", "5"))
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def open_embedding_store(model_id: str, dim: int) -> Optional["EmbeddingStore"]:
+    if not EMBEDDING_STORE_ENABLED:
+        return None
+    try:
+        return EmbeddingStore(model_id, dim)
+    except (OSError, ValueError) as e:
+        # Sem o store o classificador continua funcionando, só recalcula os embeddings
+        print(f"Erro ao abrir o embedding store: {e}")
+        return None
+
+
+class EmbeddingStore:
+    # Guarda em disco os embeddings já calculados, indexados pelo hash do texto
+    # pré-processado. Os vetores ficam numa matriz binária (float32 ou float16)
+    # lida via memmap e o índice é um arquivo de hashes, uma linha por vetor.
+    # Ambos só recebem append; um lock de arquivo permite vários workers.
+    # Embeddings das requisições ficam em memória (já servem de cache) e vão
+    # para o disco em lote numa thread, sem fsync; só a carga em massa
+    # (treino, durable=True) grava na hora com fsync.
+
+    def __init__(self, model_id: str, dim: int, directory: str = EMBEDDING_STORE_DIR,
+                 dtype: str = EMBEDDING_STORE_DTYPE, max_rows: int = EMBEDDING_STORE_MAX_ROWS):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"dtype inválido para o embedding store: {dtype}")
+
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.max_rows = max_rows
+        self.row_bytes = self.dim * self.dtype.itemsize
+
+        namespace = re.sub(r"[^A-Za-z0-9_.-]", "_", model_id)
+        self.directory = os.path.join(directory, f"{namespace}-{dim}-{dtype}")
+        os.makedirs(self.directory, exist_ok=True)
+        self._vectors_path = os.path.join(self.directory, "vectors.bin")
+        self._keys_path = os.path.join(self.directory, "keys.txt")
+        self._lock_path = os.path.join(self.directory, ".lock")
+
+        self._lock = threading.Lock()  # índice e contadores (leituras no caminho da requisição)
+        self._write_lock = threading.Lock()  # gravações em disco deste processo
+        self._wakeup = threading.Event()
+        self._worker = None
+        self._staged: Dict[str, np.ndarray] = {}
+        self._index: Dict[str, int] = {}
+        self._rows = 0
+        self._keys_offset = 0
+        self._matrix = None
+        self.hits = 0
+        self.misses = 0
+
+        with self._write_lock, self._file_lock():
+            self._sync()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def encode(self, texts: Sequence[str], encode_fn: Callable[[List[str]], np.ndarray], durable: bool = False) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        keys = [text_key(t) for t in texts]
+        result = np.empty((len(texts), self.dim), dtype=np.float32)
+
+        with self._lock:
+            missing = self._fill_known(keys, result)
+
+        if missing:
+            # Só os textos desconhecidos vão para o encoder, numa única chamada
+            unique: Dict[str, int] = {}
+            for i in missing:
+                unique.setdefault(keys[i], i)
+            encoded = np.asarray(encode_fn([texts[i] for i in unique.values()]), dtype=np.float32)
+            by_key = dict(zip(unique.keys(), encoded))
+            for i in missing:
+                result[i] = by_key[keys[i]]
+
+            if durable:
+                self._append(list(by_key.keys()), encoded, fsync=True)
+            else:
+                self._stage(list(by_key.keys()), encoded)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return result
+
+    def flush(self):
+        # Grava os vetores em memória; chamado pela thread e no encerramento do processo
+        with self._lock:
+            staged = dict(self._staged)
+        if not staged:
+            return
+        try:
+            self._append(list(staged.keys()), np.stack(list(staged.values())), fsync=False)
+        except OSError as e:
+            # É só cache: o que não foi gravado é recalculado depois
+            print(f"Erro ao gravar o embedding store: {e}")
+        finally:
+            with self._lock:
+                for key in staged:
+                    self._staged.pop(key, None)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "rows": self._rows,
+                "staged": len(self._staged),
+                "dtype": self.dtype.name,
+                "bytes_on_disk": self._rows * self.row_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _fill_known(self, keys: List[str], out: np.ndarray) -> List[int]:
+        missing = []
+        for i, key in enumerate(keys):
+            row = self._index.get(key)
+            if row is not None:
+                out[i] = self._matrix[row]
+            elif key in self._staged:
+                out[i] = self._staged[key]
+            else:
+                missing.append(i)
+        return missing
+
+    def _stage(self, keys: List[str], vectors: np.ndarray):
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                if key not in self._index and self._rows + len(self._staged) < self.max_rows:
+                    self._staged.setdefault(key, vector)
+            full = len(self._staged) >= EMBEDDING_STORE_FLUSH_SIZE
+        self._ensure_worker()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-store", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=EMBEDDING_STORE_FLUSH_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            self.flush()
+
+    def _append(self, keys: List[str], vectors: np.ndarray, fsync: bool):
+        # O _lock só é pego para atualizar o índice: as leituras não esperam o disco
+        with self._write_lock, self._file_lock():
+            # Outro processo pode ter gravado os mesmos textos nesse meio tempo
+            self._sync()
+            with self._lock:
+                new = [(k, v) for k, v in zip(keys, vectors) if k not in self._index]
+            new = new[:max(0, self.max_rows - self._rows)]
+            if not new:
+                return
+
+            rows = self._rows
+            block = np.stack([v for _, v in new]).astype(self.dtype)
+
+            # Vetores primeiro, hashes depois: o índice nunca aponta para um vetor incompleto
+            with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "wb") as f:
+                f.truncate(rows * self.row_bytes)
+                f.seek(rows * self.row_bytes)
+                f.write(block.tobytes())
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            with open(self._keys_path, "r+b" if os.path.exists(self._keys_path) else "wb") as f:
+                f.truncate(self._keys_offset)
+                f.seek(self._keys_offset)
+                f.write("".join(f"{k}\n" for k, _ in new).encode("ascii"))
+
+            self._sync()
+
+    def _sync(self):
+        # Lê os hashes adicionados desde a última leitura (inclusive por outros processos).
+        # Chamado com _write_lock e o lock de arquivo; o _lock só na troca do índice.
+        keys: List[str] = []
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "rb") as f:
+                f.seek(self._keys_offset)
+                data = f.read()
+            # Ignora uma última linha incompleta (gravação interrompida)
+            keys = data[:data.rfind(b"\n") + 1].decode("ascii").splitlines()
+
+        # Sem fsync, uma queda do sistema pode levar o fim dos vetores e deixar os
+        # hashes: o índice para no último vetor completo (o resto é regravado)
+        available = os.path.getsize(self._vectors_path) // self.row_bytes if os.path.exists(self._vectors_path) else 0
+        keys = keys[:max(0, available - self._rows)]
+
+        rows = self._rows + len(keys)
+        matrix = self._matrix
+        if rows == 0:
+            matrix = np.zeros((0, self.dim), dtype=self.dtype)
+        elif matrix is None or matrix.shape[0] != rows:
+            matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+
+        with self._lock:
+            for offset, key in enumerate(keys):
+                self._index.setdefault(key, self._rows + offset)
+            self._rows = rows
+            self._keys_offset += sum(len(key) + 1 for key in keys)
+            self._matrix = matrix
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
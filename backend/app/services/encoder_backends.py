@@ -0,0 +1,138 @@
+import os
+from typing import List, Sequence
+import numpy as np
+from app.services.classifier_artifact import EMBEDDING_MODEL_ID, MODEL_DIR
+
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")  # torch | onnx | onnx-int8
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "0"))  # 0 = padrão da biblioteca
+ENCODER_BATCH_SIZE = int(os.getenv("ENCODER_BATCH_SIZE", "32"))
+ENCODER_MAX_LENGTH = int(os.getenv("ENCODER_MAX_LENGTH", "256"))
+ONNX_DIR = os.getenv("ONNX_DIR", os.path.join(MODEL_DIR, "onnx"))
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def load_encoder(backend: str = ENCODER_BACKEND, model_id: str = EMBEDDING_MODEL_ID):
+    if backend == "torch":
+        return TorchEncoder(model_id)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEncoder(model_id, quantized=backend == "onnx-int8")
+    raise ValueError(f"ENCODER_BACKEND inválido: {backend} (use {', '.join(ENCODER_BACKENDS)})")
+
+
+class TorchEncoder:
+    # SentenceTransformer original (PyTorch)
+    backend = "torch"
+
+    def __init__(self, model_id: str = EMBEDDING_MODEL_ID):
+        from sentence_transformers import SentenceTransformer
+
+        if ENCODER_THREADS > 0:
+            import torch
+            torch.set_num_threads(ENCODER_THREADS)
+
+        self.model = SentenceTransformer(model_id)
+        self.tokenizer = self.model.tokenizer
+        self.max_length = self.model.max_seq_length
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        # Mesmo id de antes: artefatos e embeddings já gravados continuam valendo
+        self.model_id = model_id
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(list(texts), batch_size=ENCODER_BATCH_SIZE)
+
+
+class OnnxEncoder:
+    # O mesmo MiniLM exportado para ONNX e executado pelo ONNX Runtime, sem PyTorch
+    # em tempo de execução. A exportação (e a quantização int8 dinâmica dos pesos)
+    # acontece uma única vez e fica em ONNX_DIR; a inferência reproduz o pooling
+    # do SentenceTransformer: média dos tokens + normalização L2.
+
+    def __init__(self, model_id: str = EMBEDDING_MODEL_ID, quantized: bool = True):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.backend = "onnx-int8" if quantized else "onnx"
+        # Embeddings de outro backend não são idênticos: artefato e store separados
+        self.model_id = f"{model_id}+{self.backend}"
+
+        directory = export_onnx(model_id)
+        model_path = os.path.join(directory, "model-int8.onnx" if quantized else "model.onnx")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if ENCODER_THREADS > 0:
+            options.intra_op_num_threads = ENCODER_THREADS
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.max_length = ENCODER_MAX_LENGTH
+        self.dimension = int(self.session.get_outputs()[0].shape[-1])
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        result = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        # Ordena por tamanho para cada lote ter pouco padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), ENCODER_BATCH_SIZE):
+            indices = order[start:start + ENCODER_BATCH_SIZE]
+            result[indices] = self._encode_batch([texts[i] for i in indices])
+        return result
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        feed = {name: tokens[name].astype(np.int64) for name in self._inputs if name in tokens}
+        hidden = self.session.run(None, feed)[0]
+
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+
+def export_onnx(model_id: str = EMBEDDING_MODEL_ID) -> str:
+    # Exporta o modelo do Hugging Face para ONNX e gera a versão int8; só na primeira vez
+    directory = os.path.join(ONNX_DIR, model_id.replace("/", "_"))
+    fp32_path = os.path.join(directory, "model.onnx")
+    int8_path = os.path.join(directory, "model-int8.onnx")
+    if os.path.exists(fp32_path) and os.path.exists(int8_path):
+        return directory
+
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(directory, exist_ok=True)
+    repo_id = model_id if "/" in model_id else f"sentence-transformers/{model_id}"
+    tokenizer = AutoTokenizer.from_pretrained(repo_id)
+    model = AutoModel.from_pretrained(repo_id).eval()
+
+    sample = tokenizer(["exemplo de email"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    # Arquivos temporários + rename: outro worker nunca abre um modelo pela metade
+    tmp_fp32 = fp32_path + f".{os.getpid()}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            tmp_fp32,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    tmp_int8 = int8_path + f".{os.getpid()}.tmp"
+    quantize_dynamic(tmp_fp32, tmp_int8, weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(directory)
+    os.replace(tmp_fp32, fp32_path)
+    os.replace(tmp_int8, int8_path)
+    return directory
@@ -0,0 +1,302 @@
+import json
+import os
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy.exc import DataError, IntegrityError
+from app.database import SessionLocal
+from app.services.email_history_service import EmailHistoryService
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+HISTORY_WRITE_BEHIND = os.getenv("HISTORY_WRITE_BEHIND", "false").lower() == "true"
+HISTORY_FLUSH_SIZE = int(os.getenv("HISTORY_FLUSH_SIZE", "200"))
+HISTORY_FLUSH_INTERVAL_MS = float(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "500"))
+HISTORY_BUFFER_MAX = int(os.getenv("HISTORY_BUFFER_MAX", "10000"))
+HISTORY_SPILL_POLICY = os.getenv("HISTORY_SPILL_POLICY", "disk")  # disk | sync | drop
+HISTORY_SPILL_PATH = os.getenv(
+    "HISTORY_SPILL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "spool", "history.jsonl"),
+)
+# Linhas que o banco recusa (dados inválidos, conflito de ticket) mesmo gravadas uma a uma
+HISTORY_DEAD_LETTER_PATH = os.getenv(
+    "HISTORY_DEAD_LETTER_PATH",
+    os.path.join(os.path.dirname(HISTORY_SPILL_PATH), "history.dead.jsonl"),
+)
+
+# Erros do próprio registro: repetir o lote não adianta
+DATA_ERRORS = (DataError, IntegrityError, ValueError, TypeError)
+
+
+class HistoryWriter:
+    # Buffer write-behind do histórico: a requisição recebe um ticket na hora e
+    # as linhas são gravadas em lote por uma thread (por tamanho ou intervalo).
+    # Com o buffer cheio, a política decide: gravar em disco e reprocessar depois
+    # (disk), gravar na própria requisição (sync) ou descartar (drop).
+    # Tickets ficam em _pending até a linha ir para o banco: "pending" no buffer,
+    # "spilled" enquanto esperam no arquivo para serem regravados.
+    _instance = None  # Singleton
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if hasattr(self, "_initialized") and self._initialized:
+            return
+        self._initialized = True
+
+        if HISTORY_SPILL_POLICY not in ("disk", "sync", "drop"):
+            raise ValueError(f"HISTORY_SPILL_POLICY inválida: {HISTORY_SPILL_POLICY}")
+
+        self._buffer: deque = deque()
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self._worker = None
+
+        self._written = 0
+        self._flushes = 0
+        self._spilled = 0
+        self._dropped = 0
+        self._sync_writes = 0
+        self._errors = 0
+        self._dead_lettered = 0
+
+    def submit(self, email_data: Dict[str, Any]) -> str:
+        return self.submit_many([email_data])[0]
+
+    def submit_many(self, emails_data: List[Dict[str, Any]]) -> List[str]:
+        records = [self._to_record(email_data) for email_data in emails_data]
+        overflow: List[Dict[str, Any]] = []
+
+        with self._lock:
+            for record in records:
+                if len(self._buffer) < HISTORY_BUFFER_MAX and not self._stopped:
+                    self._buffer.append(record)
+                    self._pending[record["ticket"]] = "pending"
+                else:
+                    overflow.append(record)
+                    if HISTORY_SPILL_POLICY != "drop":
+                        self._pending[record["ticket"]] = "pending"
+            should_flush = len(self._buffer) >= HISTORY_FLUSH_SIZE
+
+        if overflow:
+            self._handle_overflow(overflow)
+
+        self._ensure_worker()
+        if should_flush:
+            self._wakeup.set()
+        return [record["ticket"] for record in records]
+
+    def start(self):
+        # Sobe a thread já na inicialização para reprocessar o que ficou em disco
+        self._ensure_worker()
+
+    def pending(self, ticket: str) -> Optional[str]:
+        # "pending", "spilled" ou None (já gravado, descartado ou desconhecido)
+        with self._lock:
+            return self._pending.get(ticket)
+
+    def flush(self):
+        # Grava o que estiver no buffer e também o que foi despejado em disco
+        with self._flush_lock:
+            self._drain_spill()
+            while True:
+                with self._lock:
+                    batch = [self._buffer.popleft() for _ in range(min(HISTORY_FLUSH_SIZE, len(self._buffer)))]
+                if not batch:
+                    break
+                self._write(batch)
+
+    def close(self):
+        with self._lock:
+            self._stopped = True
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout=30)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": HISTORY_WRITE_BEHIND,
+                "buffered": len(self._buffer),
+                "buffer_max": HISTORY_BUFFER_MAX,
+                "spill_policy": HISTORY_SPILL_POLICY,
+                "written": self._written,
+                "flushes": self._flushes,
+                "spilled": self._spilled,
+                "dropped": self._dropped,
+                "sync_writes": self._sync_writes,
+                "errors": self._errors,
+                "dead_lettered": self._dead_lettered,
+            }
+
+    def _to_record(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Guarda só o que vai para o banco (prévias e texto pré-processado), não o conteúdo inteiro do email
+        return {
+            "ticket": uuid.uuid4().hex,
+            "raw_content": (email_data.get("raw_content") or "")[:200],
+            "suggested_response": (email_data.get("suggested_response") or "")[:200],
+            "processed_content": email_data.get("processed_content"),
+            "category": email_data.get("category", "unknown"),
+            "confidence": email_data.get("confidence", 0.0),
+            "input_type": email_data.get("input_type", "text"),
+            "analyzed_at": datetime.now().isoformat(),
+        }
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._stopped:
+                return
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        interval = HISTORY_FLUSH_INTERVAL_MS / 1000.0
+        while True:
+            self._wakeup.wait(timeout=interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Erro ao gravar histórico em lote: {e}")
+            with self._lock:
+                if self._stopped:
+                    return
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            self._insert(batch)
+            with self._lock:
+                self._flushes += 1
+            return
+        except DATA_ERRORS as e:
+            # Uma linha ruim não segura o lote inteiro: grava uma a uma
+            print(f"Erro ao gravar histórico em lote, gravando linha a linha: {e}")
+            with self._lock:
+                self._errors += 1
+        except Exception as e:
+            print(f"Erro ao gravar histórico em lote: {e}")
+            with self._lock:
+                self._errors += 1
+            self._retry_later(batch)
+            return
+
+        for index, record in enumerate(batch):
+            try:
+                self._insert([record])
+            except DATA_ERRORS as e:
+                print(f"Erro ao gravar linha do histórico, movida para {HISTORY_DEAD_LETTER_PATH}: {e}")
+                self._dead_letter(record, e)
+            except Exception as e:
+                print(f"Erro ao gravar histórico: {e}")
+                self._retry_later(batch[index:])
+                return
+
+    def _insert(self, batch: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            rows = [dict(record, analyzed_at=datetime.fromisoformat(record["analyzed_at"])) for record in batch]
+            EmailHistoryService(db).save_emails(rows)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        with self._lock:
+            self._written += len(batch)
+            for record in batch:
+                self._pending.pop(record["ticket"], None)
+
+    def _retry_later(self, records: List[Dict[str, Any]]):
+        # Não perde o lote: vai para o disco e é reprocessado no próximo flush
+        if HISTORY_SPILL_POLICY == "drop":
+            with self._lock:
+                self._dropped += len(records)
+                for record in records:
+                    self._pending.pop(record["ticket"], None)
+        else:
+            self._spill(records)
+
+    def _dead_letter(self, record: Dict[str, Any], error: Exception):
+        with self._locked_file(HISTORY_DEAD_LETTER_PATH):
+            with open(HISTORY_DEAD_LETTER_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(dict(record, error=str(error)), ensure_ascii=False) + "\n")
+        with self._lock:
+            self._dead_lettered += 1
+            self._pending.pop(record["ticket"], None)
+
+    def _handle_overflow(self, records: List[Dict[str, Any]]):
+        if HISTORY_SPILL_POLICY == "disk":
+            self._spill(records)
+        elif HISTORY_SPILL_POLICY == "sync":
+            with self._lock:
+                self._sync_writes += len(records)
+            self._write(records)
+        else:
+            with self._lock:
+                self._dropped += len(records)
+
+    def _spill(self, records: List[Dict[str, Any]]):
+        # Estado antes da escrita: um flush concorrente pode ler e gravar as linhas logo em seguida
+        with self._lock:
+            self._spilled += len(records)
+            for record in records:
+                self._pending[record["ticket"]] = "spilled"
+        with self._locked_file(HISTORY_SPILL_PATH):
+            with open(HISTORY_SPILL_PATH, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _drain_spill(self):
+        if not os.path.exists(HISTORY_SPILL_PATH):
+            return
+
+        # Lê e remove o arquivo sob o lock (vários workers podem compartilhar o mesmo spool);
+        # a gravação no banco acontece fora dele e, se falhar, volta para um arquivo novo
+        records = []
+        with self._locked_file(HISTORY_SPILL_PATH):
+            if not os.path.exists(HISTORY_SPILL_PATH):
+                return
+            with open(HISTORY_SPILL_PATH, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        records.append(json.loads(line))
+            os.unlink(HISTORY_SPILL_PATH)
+
+        # Linhas despejadas por outros processos também passam a ser acompanhadas aqui
+        with self._lock:
+            for record in records:
+                self._pending[record["ticket"]] = "spilled"
+
+        for start in range(0, len(records), HISTORY_FLUSH_SIZE):
+            self._write(records[start:start + HISTORY_FLUSH_SIZE])
+
+    @contextmanager
+    def _locked_file(self, path: str):
+        # Lock próprio dos arquivos (threads) + flock (processos); o _lock do
+        # buffer fica livre durante a E/S em disco
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._file_lock, open(path + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
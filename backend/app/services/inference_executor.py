@@ -0,0 +1,97 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from app.services.metrics import observe_stage
+from app.services.classification_batcher import MICROBATCH_ENABLED, MICROBATCH_MAX_SIZE
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(MICROBATCH_MAX_SIZE)))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+
+
+class ExecutorSaturatedError(Exception):
+    pass
+
+
+class InferenceExecutor:
+    # Executa o pipeline (spaCy, encoder, PDF, commit) fora do event loop.
+    # Threads e não processos: os modelos são singletons do processo e
+    # torch/numpy liberam o GIL nas partes pesadas.
+    _instance = None  # Singleton
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, queue_size: int = INFERENCE_QUEUE_SIZE):
+        if hasattr(self, "_initialized") and self._initialized:
+            return
+        self._initialized = True
+
+        # Cada thread fica bloqueada esperando o próprio micro-lote: com menos
+        # threads que MICROBATCH_MAX_SIZE os lotes nunca chegariam ao tamanho máximo
+        self.workers = max(1, workers, MICROBATCH_MAX_SIZE if MICROBATCH_ENABLED else 1)
+        self.capacity = self.workers + max(0, queue_size)
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._pool = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # Backpressure: sem vaga livre, rejeita na hora em vez de enfileirar sem limite
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturatedError("Servidor ocupado, tente novamente em instantes")
+
+        with self._lock:
+            self._in_flight += 1
+        # A thread roda com o contexto da requisição (tempos por etapa do Server-Timing)
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+
+        def call():
+            observe_stage("executor_wait", time.perf_counter() - submitted)
+            return fn(*args)
+
+        try:
+            future = self._get_pool().submit(context.run, call)
+        except Exception:
+            self._release()
+            raise
+
+        # A vaga só é liberada quando a thread termina, mesmo se o cliente desconectar
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # O pool só é criado no primeiro uso
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+            return self._pool
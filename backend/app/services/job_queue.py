@@ -0,0 +1,183 @@
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, defer
+from app.models.processing_job import ProcessingJob
+from app.models.processing_job_result import ProcessingJobResult
+
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+JOB_KINDS = ("batch", "pdf", "txt", "mailbox")
+
+
+class JobQueue:
+    # Fila de processamento sobre a tabela processing_jobs. No PostgreSQL a reserva
+    # usa FOR UPDATE SKIP LOCKED; em qualquer banco ela só vale se o UPDATE
+    # condicional (status ainda "queued") alterar a linha, então dois workers
+    # nunca executam o mesmo job.
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(self, kind: str, payload: bytes, filename: Optional[str] = None, total: Optional[int] = None) -> ProcessingJob:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Tipo de job inválido: {kind}")
+
+        job = ProcessingJob(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            status="queued",
+            filename=filename,
+            payload=payload,
+            total=total,
+            processed=0,
+            attempts=0,
+            created_at=datetime.now(),
+        )
+        self.db.add(job)
+        self.db.commit()
+        return job
+
+    def get(self, job_id: str, offset: int = 0, limit: int = 100) -> Optional[Dict[str, Any]]:
+        job = self.db.execute(
+            select(ProcessingJob).options(defer(ProcessingJob.payload)).where(ProcessingJob.id == job_id)
+        ).scalar_one_or_none()
+        if job is None:
+            return None
+
+        data = self.to_dict(job)
+        if job.kind in ("batch", "mailbox"):
+            # Resultados por email: uma página por consulta, direto da tabela
+            data["results"] = self.results(job_id, offset, limit)
+            data["result_page"] = {"offset": offset, "limit": limit, "total": self.result_count(job_id)}
+        return data
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        rows = self.db.execute(
+            select(ProcessingJobResult.result)
+            .where(ProcessingJobResult.job_id == job_id)
+            .order_by(ProcessingJobResult.position)
+            .offset(offset)
+            .limit(limit)
+        ).scalars().all()
+        return [json.loads(row) for row in rows]
+
+    def result_count(self, job_id: str) -> int:
+        return self.db.execute(
+            select(func.count()).select_from(ProcessingJobResult).where(ProcessingJobResult.job_id == job_id)
+        ).scalar_one()
+
+    def result_keys(self, job_id: str) -> Set[str]:
+        return set(self.db.execute(
+            select(ProcessingJobResult.item_key)
+            .where(ProcessingJobResult.job_id == job_id, ProcessingJobResult.item_key.isnot(None))
+        ).scalars().all())
+
+    def add_results(self, job_id: str, start: int, results: List[Dict[str, Any]], keys: Optional[List[str]] = None):
+        # Sem commit: entra na transação do histórico do mesmo bloco
+        self.db.add_all([
+            ProcessingJobResult(
+                job_id=job_id,
+                position=start + i,
+                item_key=keys[i] if keys else None,
+                result=json.dumps(result, ensure_ascii=False, default=str),
+            )
+            for i, result in enumerate(results)
+        ])
+
+    def claim(self, worker_id: str) -> Optional[ProcessingJob]:
+        self.requeue_stale()
+
+        candidates = (
+            select(ProcessingJob.id)
+            .where(ProcessingJob.status == "queued")
+            .order_by(ProcessingJob.created_at)
+            .limit(5)
+        )
+        if self.db.get_bind().dialect.name == "postgresql":
+            candidates = candidates.with_for_update(skip_locked=True)
+
+        for job_id in self.db.execute(candidates).scalars().all():
+            now = datetime.now()
+            claimed = self.db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job_id, ProcessingJob.status == "queued")
+                .values(status="running", worker=worker_id, started_at=now, heartbeat_at=now,
+                        attempts=ProcessingJob.attempts + 1)
+            ).rowcount
+            self.db.commit()
+            if claimed:
+                return self.db.get(ProcessingJob, job_id)
+        self.db.commit()
+        return None
+
+    def progress(self, job_id: str, processed: int, total: Optional[int] = None):
+        values: Dict[str, Any] = {"processed": processed, "heartbeat_at": datetime.now()}
+        if total is not None:
+            values["total"] = total
+        self.db.execute(update(ProcessingJob).where(ProcessingJob.id == job_id).values(**values))
+        self.db.commit()
+
+    def heartbeat(self, job_id: str):
+        self.db.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.id == job_id, ProcessingJob.status == "running")
+            .values(heartbeat_at=datetime.now())
+        )
+        self.db.commit()
+
+    def complete(self, job_id: str, result: Any):
+        # Mesmo commit que o histórico ainda pendente na sessão (jobs de PDF/TXT)
+        self.db.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.id == job_id)
+            .values(status="done", result=json.dumps(result, ensure_ascii=False, default=str),
+                    processed=func.coalesce(ProcessingJob.total, ProcessingJob.processed),
+                    payload=None, finished_at=datetime.now())
+        )
+        self.db.commit()
+
+    def fail(self, job_id: str, error: str):
+        self.db.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.id == job_id)
+            .values(status="failed", error=error, payload=None, finished_at=datetime.now())
+        )
+        self.db.commit()
+
+    def requeue_stale(self):
+        # Worker que morreu no meio do job: volta para a fila (ou falha após JOB_MAX_ATTEMPTS).
+        # O progresso é mantido: a nova execução pula os blocos já gravados.
+        cutoff = datetime.now() - timedelta(seconds=JOB_STALE_SECONDS)
+        stale = (ProcessingJob.status == "running", ProcessingJob.heartbeat_at < cutoff)
+        self.db.execute(
+            update(ProcessingJob)
+            .where(*stale, ProcessingJob.attempts >= JOB_MAX_ATTEMPTS)
+            .values(status="failed", error="Worker parou de responder", payload=None, finished_at=datetime.now())
+        )
+        self.db.execute(
+            update(ProcessingJob)
+            .where(*stale, ProcessingJob.attempts < JOB_MAX_ATTEMPTS)
+            .values(status="queued", worker=None)
+        )
+        self.db.commit()
+
+    @staticmethod
+    def to_dict(job: ProcessingJob) -> Dict[str, Any]:
+        return {
+            "job_id": job.id,
+            "kind": job.kind,
+            "status": job.status,
+            "filename": job.filename,
+            "progress": {"processed": job.processed, "total": job.total},
+            "attempts": job.attempts,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error,
+        }
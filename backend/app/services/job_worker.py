@@ -0,0 +1,215 @@
+import io
+import json
+import multiprocessing
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from app.database import SessionLocal
+from app.models.processing_job import ProcessingJob
+from app.services.job_queue import JobQueue
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+# false: o pool não sobe no startup da API; é o master do gunicorn que sobe (gunicorn.conf.py)
+JOB_WORKERS_IN_APP = os.getenv("JOB_WORKERS_IN_APP", "true").lower() == "true"
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "100"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+
+
+def run_worker(worker_id: str, stop_event, parent_pid: Optional[int] = None):
+    # Laço de um worker: reserva um job, executa e grava o resultado.
+    # Os modelos são carregados uma vez por processo, na primeira execução.
+    from app.services.email_classifier import EmailClassifier
+    from app.services.email_processing_engine import EmailProcessingEngine
+    from app.services.history_writer import HISTORY_WRITE_BEHIND, HistoryWriter
+    from app.services.online_learning import ONLINE_LEARNING_ENABLED, OnlineTrainer
+
+    engine = None
+    try:
+        while not stop_event.is_set():
+            # Processo da API morreu sem parar os workers: encerra também
+            if parent_pid is not None and os.getppid() != parent_pid:
+                break
+
+            db = SessionLocal()
+            try:
+                queue = JobQueue(db)
+                job = queue.claim(worker_id)
+                if job is None:
+                    db.close()
+                    stop_event.wait(JOB_POLL_INTERVAL_SECONDS)
+                    continue
+
+                if engine is None:
+                    engine = EmailProcessingEngine()
+                    # Os workers também classificam com o modelo atualizado
+                    if ONLINE_LEARNING_ENABLED:
+                        OnlineTrainer().start()
+                try:
+                    with heartbeat(job.id):
+                        result = execute_job(engine, queue, job)
+                    queue.complete(job.id, result)
+                except Exception as e:
+                    db.rollback()
+                    print(f"Erro ao executar job {job.id}: {e}")
+                    queue.fail(job.id, str(e))
+            except Exception as e:
+                print(f"Erro no worker de jobs {worker_id}: {e}")
+                stop_event.wait(JOB_POLL_INTERVAL_SECONDS)
+            finally:
+                db.close()
+    finally:
+        if HISTORY_WRITE_BEHIND:
+            HistoryWriter().close()
+        EmailClassifier.flush_embeddings()
+
+
+@contextmanager
+def heartbeat(job_id: str):
+    # Sinal de vida enquanto o job roda, numa thread com sessão própria: uma etapa
+    # longa (um PDF grande, um bloco lento) não faz o job parecer parado e voltar à fila
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(JOB_HEARTBEAT_SECONDS):
+            db = SessionLocal()
+            try:
+                JobQueue(db).heartbeat(job_id)
+            except Exception as e:
+                print(f"Erro ao registrar heartbeat do job {job_id}: {e}")
+            finally:
+                db.close()
+
+    thread = threading.Thread(target=beat, name="job-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def compact_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    # O que fica guardado por email no job: sem o texto (bruto ou pré-processado)
+    keys = ("status", "category", "confidence", "email_type", "saved_id", "history_ticket", "error")
+    return {key: result[key] for key in keys if key in result}
+
+
+def execute_job(engine, queue: JobQueue, job: ProcessingJob) -> Any:
+    db = queue.db
+
+    # O histórico de cada bloco é gravado sem commit (e sem write-behind) e entra na
+    # mesma transação que os resultados e o progresso: um job que volta para a fila
+    # pula o que já foi gravado, sem duplicar o histórico
+    if job.kind == "batch":
+        emails: List[str] = json.loads(job.payload.decode("utf-8"))
+        done = queue.result_count(job.id)
+        queue.progress(job.id, done, len(emails))
+        for start in range(done, len(emails), JOB_CHUNK_SIZE):
+            outputs = engine.process_emails(
+                emails[start:start + JOB_CHUNK_SIZE], "text", db, write_behind=False, commit=False
+            )
+            queue.add_results(job.id, start, [compact_result(r) for r in outputs])
+            queue.progress(job.id, start + len(outputs))
+        return None  # resultados em GET /api/jobs/{id}, paginados
+
+    if job.kind in ("pdf", "txt"):
+        queue.progress(job.id, 0, 1)
+        result = engine.process_emails([job.payload], job.kind, db, write_behind=False, commit=False)[0]
+        if result.get("status") != "success":
+            raise RuntimeError(result.get("error") or "Falha ao processar o arquivo")
+        # Um email só: a resposta sugerida completa também vai no resultado (commit em complete)
+        return dict(compact_result(result), suggested_response=result.get("suggested_response"))
+
+    if job.kind == "mailbox":
+        from app.services.mailbox_ingestion import MailboxIngestion
+
+        # O total de mensagens não é conhecido antes de ler a caixa inteira;
+        # as mensagens já gravadas numa execução anterior são puladas
+        done = queue.result_keys(job.id)
+        stored = [len(done)]
+
+        def persist(results: List[Dict[str, Any]]):
+            queue.add_results(job.id, stored[0], results, keys=[r["message_id"] for r in results])
+            stored[0] += len(results)
+            queue.progress(job.id, stored[0])
+
+        ingestion = MailboxIngestion(engine=engine, batch_size=JOB_CHUNK_SIZE, done=done)
+        return ingestion.run(io.BytesIO(job.payload), db=db, name=job.filename or "", on_batch=persist)
+
+    raise ValueError(f"Tipo de job inválido: {job.kind}")
+
+
+class JobWorkerPool:
+    # Processos locais que consomem a fila de jobs. A API sobe JOB_WORKERS deles;
+    # com JOB_WORKERS=0 os workers rodam à parte (python -m app.job_worker).
+    _instance = None  # Singleton
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        if hasattr(self, "_initialized") and self._initialized:
+            return
+        self._initialized = True
+
+        self.workers = workers
+        # spawn: o processo pai já tem threads (torch, executor); não são daemon
+        # porque a leitura de PDF cria o próprio pool de processos
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._processes = []
+        self._owner_pid = None
+
+    def start(self):
+        # Já iniciado neste processo
+        if self._processes:
+            return
+        self._owner_pid = os.getpid()
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        for i in range(self.workers):
+            process = self._context.Process(
+                target=run_worker,
+                args=(f"{prefix}-{i}", self._stop, os.getpid()),
+                name=f"job-worker-{i}",
+            )
+            process.start()
+            self._processes.append(process)
+
+    def detach(self):
+        # Processo criado por fork de quem subiu o pool (worker do gunicorn): os
+        # processos não são filhos dele e o multiprocessing tentaria esperá-los na saída
+        if self._owner_pid == os.getpid():
+            return
+        for process in self._processes:
+            multiprocessing.process._children.discard(process)
+        self._processes = []
+
+    def join(self):
+        if self._owner_pid != os.getpid():
+            return
+        for process in self._processes:
+            process.join()
+
+    def stop(self, timeout: float = 30):
+        if self._owner_pid != os.getpid():
+            return
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                # O job em andamento volta para a fila depois de JOB_STALE_SECONDS
+                process.terminate()
+        self._processes = []
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "owner_pid": self._owner_pid,
+            # Processos de outro pai (master do gunicorn) não podem ser consultados daqui
+            "alive": sum(1 for process in self._processes if process.is_alive()) if self._owner_pid == os.getpid() else None,
+        }
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import time
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Set, Tuple, Union
+from sqlalchemy.orm import Session
+from app.services.email_processing_engine import EmailProcessingEngine
+from app.utils.read_mailbox import iter_messages, message_text
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_CHECKPOINT_DIR = os.getenv(
+    "INGEST_CHECKPOINT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "spool", "ingest"),
+)
+
+
+def checkpoint_path_for(source: str) -> str:
+    # Um checkpoint por origem (caminho absoluto), para retomar com o mesmo comando
+    digest = hashlib.sha256(os.path.abspath(source).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(INGEST_CHECKPOINT_DIR, f"{digest}.txt")
+
+
+class MailboxIngestion:
+    # Importa caixas de email inteiras: lê as mensagens uma a uma, classifica em
+    # lotes pelo engine e, depois que cada lote é salvo, registra as chaves das
+    # mensagens no checkpoint. Reexecutar após uma falha pula o que já foi feito.
+    # O histórico é gravado na hora, mesmo com HISTORY_WRITE_BEHIND: o checkpoint
+    # só pode marcar mensagens cujas linhas já estão no banco.
+    # dry_run: só classifica, sem gravar histórico. on_batch: recebe os resultados
+    # de cada lote com o histórico ainda sem commit e fecha a transação (jobs).
+
+    def __init__(self, engine: Optional[EmailProcessingEngine] = None, batch_size: int = INGEST_BATCH_SIZE,
+                 checkpoint_path: Optional[str] = None, dry_run: bool = False, done: Optional[Set[str]] = None):
+        self.engine = engine or EmailProcessingEngine()
+        self.batch_size = max(1, batch_size)
+        self.checkpoint_path = checkpoint_path
+        self.dry_run = dry_run
+        self.done = done or set()  # chaves já importadas além das do checkpoint
+
+    def run(
+        self,
+        source: Union[str, BinaryIO],
+        db: Optional[Session] = None,
+        name: str = "",
+        max_messages: Optional[int] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        keep_results: bool = False,
+        on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ) -> Dict[str, Any]:
+        done = self._load_checkpoint() | self.done
+        summary: Dict[str, Any] = {
+            "processed": 0,
+            "skipped": 0,
+            "empty": 0,
+            "errors": 0,
+            "categories": {},
+            "truncated": False,
+        }
+        results: List[Dict[str, Any]] = []
+        started = time.perf_counter()
+
+        batch: List[Tuple[str, str, str]] = []
+        seen = 0
+        for key, message in iter_messages(source, name):
+            if key in done:
+                summary["skipped"] += 1
+                continue
+            if max_messages is not None and seen >= max_messages:
+                summary["truncated"] = True
+                break
+            seen += 1
+
+            try:
+                text = message_text(message)
+            except Exception as e:
+                print(f"Erro ao ler mensagem {key}: {e}")
+                summary["errors"] += 1
+                continue
+            if not text:
+                summary["empty"] += 1
+                continue
+
+            batch.append((key, str(message.get("subject") or ""), text))
+            if len(batch) >= self.batch_size:
+                self._process_batch(batch, db, summary, results if keep_results else None, done, on_batch)
+                batch = []
+                self._report(summary, started, progress)
+
+        if batch:
+            self._process_batch(batch, db, summary, results if keep_results else None, done, on_batch)
+        self._report(summary, started, progress)
+
+        summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        if keep_results:
+            summary["results"] = results
+        return summary
+
+    def _process_batch(self, batch: List[Tuple[str, str, str]], db: Optional[Session], summary: Dict[str, Any],
+                       results: Optional[List[Dict[str, Any]]], done: Set[str],
+                       on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        outputs = self.engine.process_emails(
+            [text for _, _, text in batch], "email", db, save_history=not self.dry_run, write_behind=False,
+            commit=on_batch is None,
+        )
+
+        completed = []
+        batch_results: List[Dict[str, Any]] = []
+        for (key, subject, _), output in zip(batch, outputs):
+            if output.get("status") != "success":
+                summary["errors"] += 1
+                continue
+            summary["processed"] += 1
+            category = output["category"]
+            summary["categories"][category] = summary["categories"].get(category, 0) + 1
+            completed.append(key)
+
+            batch_results.append({
+                "message_id": key,
+                "subject": subject,
+                "category": category,
+                "confidence": output["confidence"],
+                "email_type": output["email_type"],
+                "saved_id": output.get("saved_id"),
+            })
+
+        if on_batch is not None:
+            on_batch(batch_results)
+        if results is not None:
+            results.extend(batch_results)
+
+        # Só marca como feito depois que o lote foi salvo
+        done.update(completed)
+        self._save_checkpoint(completed)
+
+    def _report(self, summary: Dict[str, Any], started: float, progress: Optional[Callable[[Dict[str, Any]], None]]):
+        if progress is None:
+            return
+        elapsed = time.perf_counter() - started
+        progress({
+            "processed": summary["processed"],
+            "skipped": summary["skipped"],
+            "errors": summary["errors"],
+            "elapsed_seconds": round(elapsed, 3),
+            "messages_per_second": round(summary["processed"] / elapsed, 2) if elapsed > 0 else 0.0,
+        })
+
+    def _load_checkpoint(self) -> Set[str]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            return {line.rstrip("\n") for line in f if line.strip()}
+
+    def _save_checkpoint(self, keys: List[str]):
+        if not self.checkpoint_path or not keys:
+            return
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            f.write("".join(f"{key}\n" for key in keys))
+            f.flush()
+            os.fsync(f.fileno())
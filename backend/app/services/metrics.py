@@ -0,0 +1,186 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Iterator, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+# Com vários workers (gunicorn) cada processo grava seus valores neste diretório
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# Tempos por etapa da requisição atual (None fora de uma requisição). O dicionário é
+# compartilhado com as threads do executor, que recebem uma cópia do contexto.
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def _load_prometheus():
+    if not METRICS_ENABLED:
+        return None
+    try:
+        import prometheus_client
+        return prometheus_client
+    except ImportError as e:
+        print(f"Erro ao carregar prometheus_client, métricas desativadas: {e}")
+        return None
+
+
+prometheus = _load_prometheus()
+
+if prometheus is not None:
+    STAGE_SECONDS = prometheus.Histogram(
+        "automail_stage_seconds", "Duração de cada etapa do pipeline", ["stage"], buckets=STAGE_BUCKETS,
+    )
+    BATCH_SIZE = prometheus.Histogram(
+        "automail_batch_size", "Itens por lote (micro-lote do classificador, classify_many, process_emails)",
+        ["kind"], buckets=BATCH_BUCKETS,
+    )
+    REQUEST_SECONDS = prometheus.Histogram(
+        "automail_http_request_seconds", "Duração das requisições HTTP", ["method", "route", "status"],
+        buckets=STAGE_BUCKETS,
+    )
+
+
+def observe_stage(stage: str, seconds: float):
+    if prometheus is not None:
+        STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def timed(name: str):
+    # Decorator: a chamada inteira conta como uma etapa
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_batch(kind: str, size: int):
+    if prometheus is not None:
+        BATCH_SIZE.labels(kind).observe(size)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    if prometheus is not None:
+        REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+
+
+@contextmanager
+def capture() -> Iterator[Dict[str, float]]:
+    # Coleta as etapas executadas dentro do bloco (requisição ou lote do batcher)
+    timings: Dict[str, float] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def add_timings(timings: Dict[str, float]):
+    # Etapas medidas em outra thread (ex.: lote do batcher) entram na requisição atual
+    current = _request_timings.get()
+    if current is not None:
+        for name, seconds in timings.items():
+            current[name] = current.get(name, 0.0) + seconds
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class RuntimeCollector:
+    # Estado lido na hora da coleta a partir dos stats() que a API já expõe:
+    # filas, cache, pool do banco. Só olha singletons já criados (não carrega modelos).
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+        from app.database import pool_status
+        from app.services.classification_batcher import ClassificationBatcher
+        from app.services.email_classifier import EmailClassifier
+        from app.services.history_writer import HistoryWriter
+        from app.services.inference_executor import InferenceExecutor
+        from app.services.result_cache import ResultCache
+
+        def gauge(name, documentation, value):
+            return GaugeMetricFamily(name, documentation, value=value)
+
+        def counter(name, documentation, value):
+            return CounterMetricFamily(name, documentation, value=value)
+
+        if ClassificationBatcher._instance is not None:
+            batcher = ClassificationBatcher().stats()
+            yield gauge("automail_batcher_queue_depth", "Classificações esperando o micro-lote", batcher["queue_depth"])
+
+        if InferenceExecutor._instance is not None:
+            executor = InferenceExecutor().stats()
+            yield gauge("automail_executor_in_flight", "Requisições no executor (rodando ou na fila)", executor["in_flight"])
+            yield gauge("automail_executor_capacity", "Vagas do executor (threads + fila)", executor["capacity"])
+            yield counter("automail_executor_rejected", "Requisições rejeitadas com 503", executor["rejected"])
+
+        if ResultCache._instance is not None:
+            cache = ResultCache().stats()
+            lookups = CounterMetricFamily("automail_result_cache_lookups", "Consultas ao cache de resultados", labels=["result"])
+            lookups.add_metric(["hit"], cache["hits"])
+            lookups.add_metric(["shared_hit"], cache["shared_hits"])
+            lookups.add_metric(["miss"], cache["misses"])
+            yield lookups
+            yield gauge("automail_result_cache_entries", "Entradas no cache local", cache["entries"])
+            yield gauge("automail_result_cache_bytes", "Memória do cache local", cache["bytes"])
+
+        classifier = EmailClassifier._instance
+        store = getattr(classifier, "embedding_store", None) if EmailClassifier.is_loaded() else None
+        if store is not None:
+            embeddings = store.stats()
+            lookups = CounterMetricFamily("automail_embedding_store_lookups", "Consultas ao store de embeddings", labels=["result"])
+            lookups.add_metric(["hit"], embeddings["hits"])
+            lookups.add_metric(["miss"], embeddings["misses"])
+            yield lookups
+            yield gauge("automail_embedding_store_rows", "Vetores gravados", embeddings["rows"])
+
+        if HistoryWriter._instance is not None:
+            yield gauge("automail_history_buffered", "Linhas do histórico esperando gravação", HistoryWriter().stats()["buffered"])
+
+        pool = pool_status()
+        for key in ("size", "checkedout", "overflow"):
+            if key in pool:
+                yield gauge(f"automail_db_pool_{key}", f"Pool de conexões do banco: {key}", pool[key])
+
+
+_collector_registered = False
+
+
+def render() -> Tuple[bytes, str]:
+    # Conteúdo do /metrics no formato texto do Prometheus
+    global _collector_registered
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Histogramas somados entre os workers; o estado lido na hora é o deste processo
+        from prometheus_client import multiprocess
+        registry = prometheus.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(RuntimeCollector())
+    else:
+        registry = prometheus.REGISTRY
+        if not _collector_registered:
+            registry.register(RuntimeCollector())
+            _collector_registered = True
+    return prometheus.generate_latest(registry), prometheus.CONTENT_TYPE_LATEST
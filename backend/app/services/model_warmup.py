@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+
+
+def preload_models() -> float:
+    # Carrega os modelos de forma síncrona, sem classificar nada. Usado pelo master
+    # do gunicorn antes do fork: os workers herdam os pesos copy-on-write.
+    # Nenhuma inferência roda aqui porque os pools de threads do torch/OpenMP
+    # não sobrevivem a um fork; o aquecimento acontece em cada worker.
+    from app.services.ai_response_generator import AIResponseGenerator
+    from app.utils.preprocessor_npl import get_nlp
+
+    started = time.perf_counter()
+    get_nlp()
+    AIResponseGenerator()
+    return time.perf_counter() - started
+
+
+class ModelWarmup:
+    # Carrega spaCy, encoder e classificador numa thread depois que a API sobe.
+    # As rotas de histórico respondem durante o carregamento; /health/ready só
+    # fica pronto quando os modelos estão em memória.
+    _instance = None  # Singleton
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if hasattr(self, "_initialized") and self._initialized:
+            return
+        self._initialized = True
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._state = "not_loaded"  # not_loaded | loading | ready | failed
+        self._error: Optional[str] = None
+        self._load_seconds: Optional[float] = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._state = "loading"
+            self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+            self._thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        from app.services.email_classifier import EmailClassifier
+
+        with self._lock:
+            state = self._state
+            # Sem warm-up, os modelos carregam na primeira classificação
+            if state == "not_loaded" and EmailClassifier.is_loaded():
+                state = "ready"
+            return {
+                "state": state,
+                "warmup_enabled": MODEL_WARMUP,
+                "load_seconds": self._load_seconds,
+                "error": self._error,
+            }
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            # Imports pesados (spaCy, torch, sklearn) só acontecem aqui
+            from app.services.ai_response_generator import AIResponseGenerator
+
+            # Uma classificação completa também aquece spaCy e o encoder;
+            # os embeddings dos templates de resposta são calculados aqui
+            generator = AIResponseGenerator()
+            generator.email_classifier.classify("Aquecimento dos modelos de classificação")
+            generator.template_index
+
+            # Aplica logo as correções já gravadas, sem esperar o ciclo do treino online
+            from app.services.online_learning import ONLINE_LEARNING_ENABLED, OnlineTrainer
+            if ONLINE_LEARNING_ENABLED:
+                OnlineTrainer().notify()
+        except Exception as e:
+            print(f"Erro ao carregar os modelos: {e}")
+            with self._lock:
+                self._state = "failed"
+                self._error = str(e)
+            return
+
+        with self._lock:
+            self._state = "ready"
+            self._load_seconds = round(time.perf_counter() - started, 3)
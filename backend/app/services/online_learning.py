@@ -0,0 +1,188 @@
+import copy
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.models.training_example import TrainingExample
+from app.services.classifier_artifact import LABELS
+from app.utils.training_data import EXAMPLES
+from app.utils.preprocessor_npl import preprocess_many
+
+ONLINE_LEARNING_ENABLED = os.getenv("ONLINE_LEARNING_ENABLED", "true").lower() == "true"
+ONLINE_LEARNING_INTERVAL_SECONDS = float(os.getenv("ONLINE_LEARNING_INTERVAL_SECONDS", "30"))
+ONLINE_LEARNING_BATCH_SIZE = int(os.getenv("ONLINE_LEARNING_BATCH_SIZE", "256"))
+ONLINE_LEARNING_EPOCHS = int(os.getenv("ONLINE_LEARNING_EPOCHS", "5"))
+ONLINE_LEARNING_RATE = float(os.getenv("ONLINE_LEARNING_RATE", "0.01"))
+ONLINE_LEARNING_REPLAY = int(os.getenv("ONLINE_LEARNING_REPLAY", "64"))
+
+LABEL_IDS = {category: label for label, category in LABELS.items()}
+
+
+def online_model(clf):
+    # SGDClassifier (regressão logística por gradiente) partindo dos pesos atuais.
+    # Sempre uma cópia: o modelo em uso não é alterado enquanto classifica.
+    from sklearn.linear_model import SGDClassifier
+
+    if isinstance(clf, SGDClassifier):
+        return copy.deepcopy(clf)
+
+    model = SGDClassifier(loss="log_loss", learning_rate="constant", eta0=ONLINE_LEARNING_RATE, shuffle=False)
+    model.coef_ = np.array(clf.coef_, dtype=np.float64)
+    model.intercept_ = np.array(clf.intercept_, dtype=np.float64)
+    model.classes_ = np.array(clf.classes_)
+    model.n_features_in_ = model.coef_.shape[1]
+    return model
+
+
+def partial_update(clf, X: np.ndarray, y: np.ndarray, replay_X: np.ndarray, replay_y: np.ndarray, seed: int):
+    # Algumas passadas de partial_fit nos exemplos novos, misturados a uma amostra
+    # dos EXAMPLES originais para o modelo não "esquecer" o que já sabia
+    model = online_model(clf)
+    rng = np.random.default_rng(seed)
+    for _ in range(ONLINE_LEARNING_EPOCHS):
+        picks = rng.choice(len(replay_X), size=min(ONLINE_LEARNING_REPLAY, len(replay_X)), replace=False)
+        # Pesos em float64 (vindos do LogisticRegression): os embeddings acompanham
+        batch_X = np.vstack([X, replay_X[picks]]).astype(np.float64)
+        batch_y = np.concatenate([y, replay_y[picks]])
+        order = rng.permutation(len(batch_y))
+        model.partial_fit(batch_X[order], batch_y[order], classes=model.classes_)
+    return model
+
+
+class OnlineTrainer:
+    # Aplica em segundo plano os exemplos revisados (training_examples) ao
+    # classificador em uso, com partial_fit sobre os embeddings (que saem do
+    # store de embeddings), e troca o modelo de uma vez só. Cada processo tem
+    # o seu: todos leem a mesma tabela, em ordem de id, e ao reiniciar
+    # reaplicam tudo a partir do artefato base.
+    _instance = None  # Singleton
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, interval_seconds: float = ONLINE_LEARNING_INTERVAL_SECONDS, batch_size: int = ONLINE_LEARNING_BATCH_SIZE):
+        if hasattr(self, "_initialized") and self._initialized:
+            return
+        self._initialized = True
+
+        self.interval = interval_seconds
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._worker = None
+        self._replay = None
+
+        # Métricas
+        self._last_id = 0
+        self._applied = 0
+        self._updates = 0
+        self._errors = 0
+        self._last_update_at: Optional[str] = None
+        self._last_error: Optional[str] = None
+
+    def start(self):
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped = False
+            self._worker = threading.Thread(target=self._run, name="online-trainer", daemon=True)
+            self._worker.start()
+
+    def notify(self):
+        # Exemplo novo gravado: não espera o próximo intervalo
+        self._wakeup.set()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout=30)
+
+    def stats(self) -> Dict[str, Any]:
+        from app.services.email_classifier import EmailClassifier
+
+        loaded = EmailClassifier.is_loaded()
+        with self._lock:
+            return {
+                "enabled": ONLINE_LEARNING_ENABLED,
+                "running": self._worker is not None and self._worker.is_alive(),
+                "model_version": EmailClassifier().artifact_version if loaded else None,
+                "last_example_id": self._last_id,
+                "examples_applied": self._applied,
+                "updates": self._updates,
+                "errors": self._errors,
+                "last_update_at": self._last_update_at,
+                "last_error": self._last_error,
+            }
+
+    def update_once(self) -> int:
+        # Aplica o próximo lote de exemplos; devolve quantos foram aplicados
+        from app.services.email_classifier import EmailClassifier
+
+        # Réplicas sem modelo carregado (MODEL_WARMUP=false) não carregam só para isso
+        if not EmailClassifier.is_loaded():
+            return 0
+
+        with self._update_lock:
+            db = SessionLocal()
+            try:
+                examples: List[TrainingExample] = db.execute(
+                    select(TrainingExample)
+                    .where(TrainingExample.id > self._last_id)
+                    .order_by(TrainingExample.id)
+                    .limit(self.batch_size)
+                ).scalars().all()
+            finally:
+                db.close()
+            if not examples:
+                return 0
+
+            classifier = EmailClassifier()
+            last_id = examples[-1].id
+            usable = [e for e in examples if e.label in LABEL_IDS]
+            if usable:
+                X = classifier.embed([e.text for e in usable])
+                y = np.array([LABEL_IDS[e.label] for e in usable])
+                replay_X, replay_y = self._replay_set(classifier)
+                model = partial_update(classifier.clf, X, y, replay_X, replay_y, seed=last_id)
+                # Versão nova: o cache de resultados descarta o que foi classificado antes
+                classifier.swap(model, f"{classifier.base_version}+o{last_id}")
+
+            with self._lock:
+                self._last_id = last_id
+                self._applied += len(usable)
+                self._updates += 1
+                self._last_update_at = datetime.now(timezone.utc).isoformat()
+            return len(examples)
+
+    def _replay_set(self, classifier):
+        if self._replay is None:
+            texts, labels = zip(*EXAMPLES)
+            embeddings = np.asarray(classifier.encode(list(preprocess_many(texts))))
+            self._replay = (embeddings, np.array(labels))
+        return self._replay
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopped:
+                    return
+            self._wakeup.clear()
+            try:
+                # Lote cheio: pode haver mais exemplos esperando
+                while self.update_once() >= self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"Erro no treino online do classificador: {e}")
+                with self._lock:
+                    self._errors += 1
+                    self._last_error = str(e)
+            self._wakeup.wait(self.interval)
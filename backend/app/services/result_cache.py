@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+RESULT_CACHE_REDIS_URL = os.getenv("RESULT_CACHE_REDIS_URL")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def content_hash(content: str) -> str:
+    # Normaliza antes do hash: cópias que só diferem em caixa/espaços caem na mesma chave
+    normalized = unicodedata.normalize("NFKC", content).lower()
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    # Cache LRU (entradas, bytes e TTL) do resultado da classificação por conteúdo.
+    # Cada entrada guarda a versão do artefato do classificador com que foi gerada
+    # e só vale para essa versão: quando o modelo muda, as entradas antigas viram
+    # miss (e são substituídas ou saem pelo LRU/TTL) e as chaves antigas no Redis
+    # deixam de ser lidas. Um put atrasado da versão anterior não apaga as novas.
+    _instance = None  # Singleton
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(
+        self,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        ttl_seconds: float = RESULT_CACHE_TTL_SECONDS,
+        redis_url: Optional[str] = RESULT_CACHE_REDIS_URL,
+    ):
+        if hasattr(self, "_initialized") and self._initialized:
+            return
+        self._initialized = True
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, int, str, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+        self._redis = self._connect_redis(redis_url) if redis_url else None
+
+    def get(self, content: str, version: str) -> Optional[Dict[str, Any]]:
+        if not RESULT_CACHE_ENABLED:
+            return None
+
+        key = content_hash(content)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, size, entry_version, value = entry
+                if expires_at < time.monotonic():
+                    self._remove(key)
+                elif entry_version != version:
+                    # Gerada por outro modelo: não serve, mas também não é apagada aqui
+                    # (pode ser a versão nova, lida por uma requisição ainda na anterior)
+                    self._invalidations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return dict(value)
+
+        value = self._shared_get(key, version)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._shared_hits += 1
+            self._store(key, version, value)
+        return dict(value)
+
+    def put(self, content: str, version: str, value: Dict[str, Any]):
+        if not RESULT_CACHE_ENABLED:
+            return
+
+        key = content_hash(content)
+        with self._lock:
+            self._version = version
+            self._store(key, version, value)
+        self._shared_put(key, version, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._shared_hits + self._misses
+            return {
+                "enabled": RESULT_CACHE_ENABLED,
+                "shared_store": self._redis is not None,
+                "version": self._version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "shared_hits": self._shared_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._shared_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+    def _store(self, key: str, version: str, value: Dict[str, Any]):
+        size = len(key) + len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl, size, version, dict(value))
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._evictions += 1
+
+    def _remove(self, key: str):
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _connect_redis(self, redis_url: str):
+        try:
+            import redis
+            return redis.Redis.from_url(redis_url)
+        except Exception as e:
+            print(f"Erro ao conectar no cache compartilhado, usando só o cache local: {e}")
+            return None
+
+    def _shared_key(self, key: str, version: str) -> str:
+        return f"automail:result:{version}:{key}"
+
+    def _shared_get(self, key: str, version: str) -> Optional[Dict[str, Any]]:
+        if self._redis is None:
+            return None
+        try:
+            raw = self._redis.get(self._shared_key(key, version))
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            print(f"Erro ao ler do cache compartilhado: {e}")
+            return None
+
+    def _shared_put(self, key: str, version: str, value: Dict[str, Any]):
+        if self._redis is None:
+            return
+        try:
+            self._redis.set(
+                self._shared_key(key, version),
+                json.dumps(value, ensure_ascii=False),
+                ex=max(1, int(self.ttl)),
+            )
+        except Exception as e:
+            print(f"Erro ao gravar no cache compartilhado: {e}")
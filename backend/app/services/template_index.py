@@ -0,0 +1,47 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.preprocessor_npl import preprocess_many
+
+
+class TemplateIndex:
+    # Embeddings normalizados de todos os templates de resposta, uma matriz por
+    # categoria. A escolha é um único produto matriz-vetor com o embedding do
+    # email (o mesmo calculado na classificação), restrito aos templates do tipo
+    # identificado; se o tipo não tiver templates, aos "generico" da categoria.
+    # Força bruta basta: 10 mil templates x 384 dimensões é ~1 ms por consulta.
+
+    def __init__(self, templates: Dict[str, Dict[str, List[str]]], encode: Callable[[List[str]], np.ndarray]):
+        self._texts: Dict[str, List[str]] = {}
+        self._types: Dict[str, np.ndarray] = {}
+        self._matrix: Dict[str, np.ndarray] = {}
+
+        for category, by_type in templates.items():
+            entries: List[Tuple[str, str]] = [(t, text) for t, texts in by_type.items() for text in texts]
+            if not entries:
+                continue
+            # Mesmo pré-processamento dos emails: os vetores ficam no mesmo espaço
+            vectors = np.asarray(encode(list(preprocess_many(text for _, text in entries))), dtype=np.float32)
+            self._matrix[category] = _normalize(vectors)
+            self._types[category] = np.array([t for t, _ in entries])
+            self._texts[category] = [text for _, text in entries]
+
+    def select(self, category: str, email_type: str, embedding: np.ndarray) -> Optional[str]:
+        matrix = self._matrix.get(category)
+        if matrix is None:
+            return None
+
+        # Só templates do tipo identificado (ou "generico", como no sorteio)
+        same_type = self._types[category] == email_type
+        if not same_type.any():
+            same_type = self._types[category] == "generico"
+        if not same_type.any():
+            return None
+
+        scores = matrix @ _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+        scores = np.where(same_type, scores, -np.inf)
+        return self._texts[category][int(scores.argmax())]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
@@ -0,0 +1,55 @@
+import os
+from typing import List, Optional
+import numpy as np
+
+CHUNKING_ENABLED = os.getenv("CHUNKING_ENABLED", "true").lower() == "true"
+CHUNK_MAX = int(os.getenv("CHUNK_MAX", "8"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "32"))
+CHUNK_POOLING = os.getenv("CHUNK_POOLING", "mean")  # mean | max | confidence
+
+CHUNK_POOLING_METHODS = ("mean", "max", "confidence")
+
+
+def chunk_text(text: str, tokenizer, window: int, overlap: int = CHUNK_OVERLAP, max_chunks: int = CHUNK_MAX) -> List[str]:
+    # Divide o texto em janelas de até `window` tokens (com sobreposição), usando os
+    # offsets do tokenizer para cortar o texto original. Acima de max_chunks janelas,
+    # fica com janelas espaçadas ao longo do documento inteiro, não só o começo.
+    # Cada token ocupa pelo menos um caractere: texto curto cabe numa janela só
+    if not CHUNKING_ENABLED or len(text) <= window or window <= 0:
+        return [text]
+
+    try:
+        offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    except (NotImplementedError, KeyError, TypeError):
+        # Tokenizer sem offsets (não "fast"): mantém o comportamento do encoder
+        return [text]
+    if len(offsets) <= window:
+        return [text]
+
+    overlap = max(0, min(overlap, window - 1))
+    # A última janela sempre chega ao fim do texto
+    starts = list(range(0, len(offsets) - overlap, window - overlap))
+    if max_chunks > 0 and len(starts) > max_chunks:
+        picks = np.linspace(0, len(starts) - 1, max_chunks).round().astype(int)
+        starts = [starts[i] for i in sorted(set(picks.tolist()))]
+
+    chunks = []
+    for start in starts:
+        end = min(start + window, len(offsets))
+        chunks.append(text[offsets[start][0]:offsets[end - 1][1]])
+    return chunks
+
+
+def pool(embeddings: np.ndarray, method: str = CHUNK_POOLING, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    # Junta os embeddings das janelas de um documento num vetor só (normalizado,
+    # como os embeddings de textos curtos que o classificador viu no treino)
+    if len(embeddings) == 1:
+        return embeddings[0]
+
+    if method == "max":
+        pooled = embeddings.max(axis=0)
+    elif method == "confidence" and weights is not None:
+        pooled = (embeddings * (weights / weights.sum())[:, None]).sum(axis=0)
+    else:
+        pooled = embeddings.mean(axis=0)
+    return pooled / max(float(np.linalg.norm(pooled)), 1e-12)
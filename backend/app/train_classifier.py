@@ -0,0 +1,36 @@
+# Treina o classificador offline e grava o artefato versionado em MODEL_DIR.
+#
+# Uso (a partir de backend/):
+#     python -m app.train_classifier          # treina só se os dados mudaram
+#     python -m app.train_classifier --force  # treina sempre
+#     python -m app.train_classifier --backend onnx-int8  # exporta o ONNX (uma vez) e treina para esse backend
+import argparse
+import json
+from app.services.classifier_artifact import MODEL_DIR, load_or_train
+from app.services.embedding_store import open_embedding_store
+from app.services.encoder_backends import ENCODER_BACKEND, ENCODER_BACKENDS, load_encoder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina e salva o artefato do classificador de emails")
+    parser.add_argument("--force", action="store_true", help="Treina mesmo que já exista artefato para os dados atuais")
+    parser.add_argument("--backend", choices=ENCODER_BACKENDS, default=ENCODER_BACKEND, help="Backend do encoder (padrão: ENCODER_BACKEND)")
+    args = parser.parse_args()
+
+    encoder = load_encoder(args.backend)
+    store = open_embedding_store(encoder.model_id, encoder.dimension)
+
+    def encode(texts):
+        # Reaproveita os embeddings já gravados dos exemplos de treino
+        if store is None:
+            return encoder.encode(texts)
+        return store.encode(texts, encoder.encode, durable=True)
+
+    _, metadata = load_or_train(encode, encoder.model_id, force=args.force)
+
+    print(f"Artefato em {MODEL_DIR}:")
+    print(json.dumps(metadata, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
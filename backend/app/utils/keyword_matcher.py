@@ -0,0 +1,92 @@
+import json
+import re
+import unicodedata
+from typing import Dict, List, Set, Tuple
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    # Minúsculas e sem acentos: "Cobrança" e "cobranca" casam com a mesma palavra-chave
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class KeywordMatcher:
+    # Índice de palavras-chave compilado uma vez: o texto é quebrado em palavras
+    # numa única passada e cada palavra é buscada em dicionários (palavra exata
+    # e prefixos), então o custo não cresce com o número de tipos/palavras-chave.
+    # Casamento por palavra inteira; "senha*" casa com qualquer palavra que
+    # comece com "senha" (senhas, ...); palavras-chave podem ter várias palavras.
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        self.types = list(keywords)  # a ordem do arquivo desempata scores iguais
+        self._order = {email_type: i for i, email_type in enumerate(self.types)}
+        # primeira palavra -> [(palavras seguintes, última é prefixo, tipos)]
+        self._by_first: Dict[str, List[Tuple[Tuple[str, ...], bool, Set[str]]]] = {}
+        # prefixo de uma palavra só -> tipos
+        self._by_prefix: Dict[str, Set[str]] = {}
+
+        for email_type, words in keywords.items():
+            for word in words:
+                is_prefix = word.endswith("*")
+                parts = tuple(_WORD.findall(normalize(word.rstrip("*"))))
+                if not parts:
+                    continue
+                if is_prefix and len(parts) == 1:
+                    self._by_prefix.setdefault(parts[0], set()).add(email_type)
+                    continue
+                entries = self._by_first.setdefault(parts[0], [])
+                for rest, prefix, types in entries:
+                    if rest == parts[1:] and prefix == is_prefix:
+                        types.add(email_type)
+                        break
+                else:
+                    entries.append((parts[1:], is_prefix, {email_type}))
+
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._by_prefix})
+
+    @classmethod
+    def from_file(cls, path: str) -> Dict[str, Tuple["KeywordMatcher", str]]:
+        # Um matcher por categoria, com o tipo usado quando nada casa
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return {
+            category: (cls(entry.get("types", {})), entry.get("default", "generico"))
+            for category, entry in config.items()
+        }
+
+    def match(self, text: str) -> List[Tuple[str, int]]:
+        # Tipos encontrados, do maior para o menor score (palavras do texto que casaram)
+        words = _WORD.findall(normalize(text))
+        scores: Dict[str, int] = {}
+
+        for i, word in enumerate(words):
+            found: Set[str] = set()
+            for rest, is_prefix, types in self._by_first.get(word, ()):
+                if self._matches_rest(words, i + 1, rest, is_prefix):
+                    found |= types
+            for length in self._prefix_lengths:
+                if length > len(word):
+                    break
+                types = self._by_prefix.get(word[:length])
+                if types:
+                    found |= types
+            for email_type in found:
+                scores[email_type] = scores.get(email_type, 0) + 1
+
+        return sorted(scores.items(), key=lambda item: (-item[1], self._order[item[0]]))
+
+    @staticmethod
+    def _matches_rest(words: List[str], start: int, rest: Tuple[str, ...], is_prefix: bool) -> bool:
+        if not rest:
+            # Palavra única exata (prefixos de uma palavra ficam em _by_prefix)
+            return True
+        if start + len(rest) > len(words):
+            return False
+        for offset, expected in enumerate(rest):
+            actual = words[start + offset]
+            last = offset == len(rest) - 1
+            if not (actual.startswith(expected) if last and is_prefix else actual == expected):
+                return False
+        return True
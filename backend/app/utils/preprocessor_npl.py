@@ -1,12 +1,95 @@
-import spacy
+import os
 import string
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List
 
-# Carrega spaCy uma vez, desativa componentes que não usa para acelerar
-nlp = spacy.load("pt_core_news_sm", disable=["ner", "parser"])
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "64"))
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", "1"))
+SPACY_PARALLEL_MIN_DOCS = int(os.getenv("SPACY_PARALLEL_MIN_DOCS", "2000"))
+# Opcional: com o lemmatizer treinável os lemas podem mudar (ver benchmarks/spacy_pipe.py --check)
+SPACY_LEAN = os.getenv("SPACY_LEAN", "false").lower() == "true"
+SPACY_MODEL = "pt_core_news_sm"
 
-def preprocess(text: str) -> str:
-    doc = nlp(text.lower())
-    return " ".join(
-        token.lemma_ for token in doc
-        if not token.is_stop and not token.is_punct
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    # Carrega o spaCy uma vez, no primeiro uso (ou no warm-up), e não na importação;
+    # desativa componentes que não usa para acelerar
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                nlp = spacy.load(SPACY_MODEL, disable=["ner", "parser"])
+                if SPACY_LEAN:
+                    for name in _unused_components(nlp):
+                        nlp.disable_pipe(name)
+                _nlp = nlp
+    return _nlp
+
+
+def pipeline_config() -> dict:
+    # Entra na chave do artefato do classificador: outro pipeline gera outro texto pré-processado
+    return {"spacy_model": SPACY_MODEL, "lean": SPACY_LEAN}
+
+
+def _unused_components(nlp) -> List[str]:
+    # Só lemas, stopwords e pontuação são usados; stopword e pontuação são atributos
+    # léxicos (não dependem do pipeline). O que o lemmatizer precisa depende do modo:
+    # "lookup" só consulta uma tabela; o "rule" lê a classe gramatical (morphologizer
+    # e attribute_ruler) e aí nada pode sair.
+    if "lemmatizer" not in nlp.pipe_names:
+        return []
+    mode = getattr(nlp.get_pipe("lemmatizer"), "mode", None)
+    if mode == "lookup":
+        return [name for name in nlp.pipe_names if name != "lemmatizer"]
+    if mode is None:
+        # Lemmatizer treinável: usa só o tok2vec
+        return [name for name in ("morphologizer", "tagger", "attribute_ruler") if name in nlp.pipe_names]
+    return []
+
+
+@dataclass
+class PreprocessedText:
+    # Resultado de uma única passada do spaCy, reaproveitado por todo o pipeline
+    text: str                                        # texto original em minúsculas
+    lemmas: List[str] = field(default_factory=list)  # lemas dos tokens sem stopwords/pontuação
+
+    @property
+    def lemmatized(self) -> str:
+        return " ".join(self.lemmas)
+
+
+def analyze(text: str) -> PreprocessedText:
+    lowered = text.lower()
+    return _from_doc(lowered, get_nlp()(lowered))
+
+
+def analyze_many(texts: Iterable[str], batch_size: int = SPACY_BATCH_SIZE, n_process: int = SPACY_N_PROCESS) -> Iterator[PreprocessedText]:
+    # Versão em lote de analyze via nlp.pipe: os documentos são processados em
+    # blocos de batch_size e devolvidos na ordem de entrada, conforme ficam prontos.
+    # Processos extras só compensam em listas grandes (cada um carrega o modelo).
+    if n_process > 1 and hasattr(texts, "__len__") and len(texts) < SPACY_PARALLEL_MIN_DOCS:
+        n_process = 1
+    lowered = (text.lower() for text in texts)
+    for doc in get_nlp().pipe(lowered, batch_size=batch_size, n_process=n_process):
+        yield _from_doc(doc.text, doc)
+
+
+def _from_doc(lowered: str, doc) -> PreprocessedText:
+    return PreprocessedText(
+        text=lowered,
+        lemmas=[token.lemma_ for token in doc if not token.is_stop and not token.is_punct],
     )
+
+
+def preprocess(text: str) -> str:
+    return analyze(text).lemmatized
+
+
+def preprocess_many(texts: Iterable[str], batch_size: int = SPACY_BATCH_SIZE, n_process: int = SPACY_N_PROCESS) -> Iterator[str]:
+    for document in analyze_many(texts, batch_size, n_process):
+        yield document.lemmatized
@@ -0,0 +1,170 @@
+import email
+import hashlib
+import os
+import re
+import zipfile
+from email import policy
+from email.message import EmailMessage
+from html import unescape
+from html.parser import HTMLParser
+from typing import BinaryIO, Iterator, List, Tuple, Union
+from app.utils.read_pdf import read_pdf
+
+MAILBOX_EXTENSIONS = (".mbox", ".mbx")
+MESSAGE_EXTENSIONS = (".eml",)
+
+_FROM_LINE = re.compile(rb"^>+From ")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def iter_messages(source: Union[str, BinaryIO], name: str = "") -> Iterator[Tuple[str, EmailMessage]]:
+    # Gera (chave, mensagem) de um mbox, diretório de .eml, ZIP ou .eml avulso,
+    # lendo uma mensagem por vez. A chave é estável entre execuções (Message-ID
+    # ou hash do conteúdo) e serve para retomar uma importação interrompida.
+    if isinstance(source, str):
+        name = name or source
+        if os.path.isdir(source):
+            yield from _iter_directory(source)
+            return
+        with open(source, "rb") as f:
+            yield from iter_messages(f, name)
+        return
+
+    lowered = name.lower()
+    is_zip = lowered.endswith(".zip") or zipfile.is_zipfile(source)
+    source.seek(0)
+    if is_zip:
+        yield from _iter_zip(source)
+    elif lowered.endswith(MESSAGE_EXTENSIONS):
+        yield _parse(source.read())
+    else:
+        for raw in _split_mbox(source):
+            yield _parse(raw)
+
+
+def message_text(message: EmailMessage) -> str:
+    # Assunto + corpo (texto puro, ou HTML convertido) + texto dos PDFs anexados
+    parts: List[str] = []
+    subject = message.get("subject")
+    if subject:
+        parts.append(str(subject))
+
+    body = _body(message)
+    if body:
+        parts.append(body)
+
+    for attachment in message.iter_attachments():
+        if attachment.get_content_type() == "application/pdf":
+            data = attachment.get_payload(decode=True)
+            if data:
+                text = read_pdf(data)
+                if text:
+                    parts.append(text)
+
+    return _BLANK_LINES.sub("\n\n", "\n\n".join(parts)).strip()
+
+
+def _iter_directory(path: str) -> Iterator[Tuple[str, EmailMessage]]:
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            lowered = filename.lower()
+            if lowered.endswith(MESSAGE_EXTENSIONS + MAILBOX_EXTENSIONS):
+                yield from iter_messages(os.path.join(root, filename))
+
+
+def _iter_zip(fileobj: BinaryIO) -> Iterator[Tuple[str, EmailMessage]]:
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            lowered = info.filename.lower()
+            if info.is_dir() or not lowered.endswith(MESSAGE_EXTENSIONS + MAILBOX_EXTENSIONS):
+                continue
+            # Descompacta sob demanda, sem extrair o arquivo inteiro
+            with archive.open(info) as member:
+                if lowered.endswith(MESSAGE_EXTENSIONS):
+                    yield _parse(member.read())
+                else:
+                    for raw in _split_mbox(member):
+                        yield _parse(raw)
+
+
+def _split_mbox(fileobj: BinaryIO) -> Iterator[bytes]:
+    # Separa as mensagens pelas linhas "From " sem carregar o mbox inteiro na memória
+    lines: List[bytes] = []
+    previous_blank = True
+    for line in fileobj:
+        if line.startswith(b"From ") and previous_blank:
+            if lines:
+                yield b"".join(lines)
+            lines = []
+        else:
+            # mboxrd: ">From " escapado volta a ser "From "
+            lines.append(line[1:] if _FROM_LINE.match(line) else line)
+        previous_blank = not line.strip()
+    if lines:
+        yield b"".join(lines)
+
+
+def _parse(raw: bytes) -> Tuple[str, EmailMessage]:
+    message = email.message_from_bytes(raw, policy=policy.default)
+    key = " ".join(str(message.get("message-id") or "").split()) or hashlib.sha256(raw).hexdigest()
+    return key, message
+
+
+def _body(message: EmailMessage) -> str:
+    part = message.get_body(preferencelist=("plain", "html"))
+    if part is None:
+        return ""
+    text = _decode(part)
+    if part.get_content_type() == "text/html":
+        text = html_to_text(text)
+    return text.strip()
+
+
+def _decode(part: EmailMessage) -> str:
+    try:
+        return part.get_content()
+    except (LookupError, UnicodeDecodeError):
+        # Charset desconhecido ou declarado errado
+        data = part.get_payload(decode=True) or b""
+        try:
+            return data.decode(part.get_content_charset() or "utf-8", errors="replace")
+        except LookupError:
+            return data.decode("utf-8", errors="replace")
+
+
+class _HTMLText(HTMLParser):
+    _SKIP = {"script", "style", "head"}
+    _BREAKS = {"br", "p", "div", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag in self._BREAKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP and self._skipping:
+            self._skipping -= 1
+        elif tag in self._BREAKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    parser = _HTMLText()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        return unescape(re.sub(r"<[^>]+>", " ", html))
+    lines = (re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in "".join(parser.parts).splitlines())
+    return "\n".join(line for line in lines if line)
@@ -1,13 +1,160 @@
+import io
+import multiprocessing
+import os
+import threading
+import time
+from typing import BinaryIO, List, Optional, Union
 import PyPDF2
 
-def read_pdf(file_path: str) -> str:
-    text = ""
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_TARGET_CHARS = int(os.getenv("PDF_TARGET_CHARS", "20000"))
+PDF_PAGE_TIMEOUT_SECONDS = float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "10"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+# PDFs até este tamanho são lidos no próprio processo, sem subir processos
+PDF_INLINE_MAX_BYTES = int(os.getenv("PDF_INLINE_MAX_BYTES", str(1024 * 1024)))
+# Leituras com processos próprios ao mesmo tempo (cada uma sobe PDF_WORKERS processos)
+PDF_MAX_CONCURRENT_READS = int(os.getenv("PDF_MAX_CONCURRENT_READS", "2"))
+# Prazo para um processo começar a tarefa (subida do processo + abertura do PDF)
+PDF_START_TIMEOUT_SECONDS = float(os.getenv("PDF_START_TIMEOUT_SECONDS", "30"))
+
+_read_slots = threading.BoundedSemaphore(max(1, PDF_MAX_CONCURRENT_READS))
+
+# Estado de cada processo worker, definido no initializer do pool da leitura
+_worker_reader: Optional[PyPDF2.PdfReader] = None
+_worker_error: Optional[Exception] = None
+_worker_started = None
+
+
+class PdfTimeoutError(RuntimeError):
+    # Extração passou do tempo limite: o texto parcial não serve para classificar
+    pass
+
+
+def read_pdf(source: Union[str, bytes, BinaryIO]) -> str:
+    # Aceita caminho, bytes ou arquivo em memória (ex.: o SpooledTemporaryFile do upload).
+    # Tempo limite excedido levanta PdfTimeoutError; PDF inválido devolve "".
     try:
-        with open(file_path, "rb") as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text() or "" 
-        return text.strip()
+        data = _read_bytes(source)
+        if PDF_WORKERS < 1 or len(data) <= PDF_INLINE_MAX_BYTES:
+            return _extract_inline(data).strip()
+        with _read_slots:
+            return _extract_in_workers(data).strip()
+    except PdfTimeoutError:
+        raise
     except Exception as e:
         print(f"Erro ao ler arquivo PDF: {e}")
         return ""
+
+
+def _read_bytes(source: Union[str, bytes, BinaryIO]) -> bytes:
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+
+def _extract_inline(data: bytes) -> str:
+    # No próprio processo não dá para interromper uma página travada: a página
+    # que passar do limite falha a leitura assim que termina
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    parts: List[str] = []
+    collected = 0
+    for index in range(min(len(reader.pages), PDF_MAX_PAGES)):
+        start = time.perf_counter()
+        page_text = reader.pages[index].extract_text() or ""
+        if time.perf_counter() - start > PDF_PAGE_TIMEOUT_SECONDS:
+            raise PdfTimeoutError("Tempo limite por página excedido ao ler o PDF")
+        parts.append(page_text)
+        collected += len(page_text)
+        # Texto suficiente para classificar: não precisa ler o resto
+        if collected >= PDF_TARGET_CHARS:
+            break
+    return "".join(parts)
+
+
+def _extract_in_workers(data: bytes) -> str:
+    # Cada leitura tem os próprios processos: os bytes vão uma vez para cada um
+    # (initializer), as tarefas levam só a faixa de páginas, e uma página travada
+    # encerra apenas os processos desta leitura
+    max_tasks = 1 + -(-PDF_MAX_PAGES // PDF_PAGES_PER_TASK)
+    context = multiprocessing.get_context("spawn")  # o servidor já tem threads: fork não é seguro
+    started = context.RawArray("d", max_tasks)  # início de cada tarefa, marcado pelo worker
+    pool = context.Pool(processes=PDF_WORKERS, initializer=_init_worker, initargs=(data, started))
+    try:
+        # Tarefa 0: o worker conta as páginas (o PDF não é interpretado neste processo)
+        page_count = min(_wait(pool.apply_async(_page_count), started, 0, 1), PDF_MAX_PAGES)
+        ranges = [
+            (start, min(start + PDF_PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)
+        ]
+
+        parts: List[str] = []
+        collected = 0
+        pending = []
+        next_range = 0
+
+        # Janela de tarefas em andamento: permite parar cedo sem extrair páginas desnecessárias
+        while pending or next_range < len(ranges):
+            while next_range < len(ranges) and len(pending) < PDF_WORKERS:
+                task = next_range + 1
+                start, end = ranges[next_range]
+                pending.append((task, end - start, pool.apply_async(_extract_pages, (task, start, end))))
+                next_range += 1
+
+            task, pages, result = pending.pop(0)
+            chunk_text = _wait(result, started, task, pages)
+            parts.append(chunk_text)
+            collected += len(chunk_text)
+            if collected >= PDF_TARGET_CHARS:
+                break
+        return "".join(parts)
+    finally:
+        # Encerra também o que ainda estiver rodando (parada antecipada ou página travada)
+        pool.terminate()
+
+
+def _wait(result, started, task: int, pages: int):
+    # O prazo conta a partir do início da tarefa no worker, não do envio
+    submitted = time.time()
+    while not result.ready():
+        began = started[task]
+        if began and time.time() - began > PDF_PAGE_TIMEOUT_SECONDS * pages:
+            raise PdfTimeoutError("Tempo limite por página excedido ao ler o PDF")
+        if not began and time.time() - submitted > PDF_START_TIMEOUT_SECONDS:
+            raise PdfTimeoutError("Processo de leitura do PDF não iniciou a tempo")
+        result.wait(0.05)
+    return result.get()
+
+
+def _init_worker(data: bytes, started):
+    # Roda uma vez em cada processo da leitura; um erro aqui volta pela primeira tarefa
+    global _worker_reader, _worker_error, _worker_started
+    _worker_started = started
+    try:
+        _worker_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    except Exception as e:
+        _worker_error = e
+
+
+def _page_count() -> int:
+    _worker_started[0] = time.time()
+    if _worker_error is not None:
+        raise _worker_error
+    return len(_worker_reader.pages)
+
+
+def _extract_pages(task: int, start: int, end: int) -> str:
+    _worker_started[task] = time.time()
+    parts: List[str] = []
+    collected = 0
+    for index in range(start, end):
+        page_text = _worker_reader.pages[index].extract_text() or ""
+        parts.append(page_text)
+        collected += len(page_text)
+        if collected >= PDF_TARGET_CHARS:
+            break
+    return "".join(parts)
@@ -1,7 +1,17 @@
-def read_txt(file_path: str) -> str:
+from typing import BinaryIO, Union
+
+
+def read_txt(source: Union[str, bytes, BinaryIO]) -> str:
+    # Aceita caminho, bytes ou arquivo em memória (upload)
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            content = file.read()
+        if isinstance(source, str):
+            with open(source, "r", encoding="utf-8") as file:
+                content = file.read()
+        elif isinstance(source, (bytes, bytearray)):
+            content = source.decode("utf-8")
+        else:
+            source.seek(0)
+            content = source.read().decode("utf-8")
         return content.strip()
     except Exception as e:
         print(f"Erro ao ler arquivo TXT: {e}")
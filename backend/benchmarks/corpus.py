@@ -0,0 +1,82 @@
+# Dados sintéticos para os benchmarks: emails em português montados a partir dos
+# EXAMPLES (saudação + corpo + frases de contexto + despedida) e PDFs simples com
+# esses textos. Mesma semente, mesmo corpus: execuções diferentes são comparáveis.
+import random
+from typing import List
+from app.utils.training_data import EXAMPLES
+
+GREETINGS = ["Olá,", "Bom dia,", "Boa tarde,", "Prezados,", "Oi, equipe,", "Caro suporte,"]
+CLOSINGS = ["Atenciosamente,", "Obrigado,", "Abraços,", "Att.,", "Aguardo retorno,", "Cordialmente,"]
+NAMES = ["Ana Souza", "Carlos Lima", "Mariana Alves", "João Pereira", "Fernanda Costa", "Rafael Gomes"]
+CONTEXT = [
+    "Segue em anexo o documento mencionado na reunião.",
+    "O número do protocolo é {n}.",
+    "Estou em contato desde a semana passada sobre este assunto.",
+    "Copio a equipe financeira para acompanhamento.",
+    "O acesso foi feito pelo aplicativo e também pelo navegador.",
+    "Caso precise de mais informações, estou à disposição.",
+    "O contrato {n} foi assinado no mês passado.",
+    "Tentei novamente hoje pela manhã, sem sucesso.",
+]
+
+# Tamanhos (frases de contexto): curtos, médios e longos o bastante para passar da
+# janela de tokens do encoder (exercita o chunking)
+SIZES = [(0, 1), (2, 4), (40, 80)]
+SIZE_WEIGHTS = [0.5, 0.4, 0.1]
+
+
+def synthetic_emails(count: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    emails = []
+    for i in range(count):
+        body, _ = EXAMPLES[rng.randrange(len(EXAMPLES))]
+        low, high = rng.choices(SIZES, SIZE_WEIGHTS)[0]
+        context = [rng.choice(CONTEXT).format(n=rng.randint(1000, 99999)) for _ in range(rng.randint(low, high))]
+        emails.append("\n".join([
+            rng.choice(GREETINGS),
+            body,
+            " ".join(context),
+            rng.choice(CLOSINGS),
+            f"{rng.choice(NAMES)} (#{i})",  # nenhum email repetido: o cache não mascara o custo
+        ]))
+    return emails
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    # PDF mínimo (uma fonte padrão, uma linha de texto por linha do email em cada página)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages)),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(pages):
+        lines = " ".join(f"({_pdf_escape(line)}) Tj T*" for line in text.splitlines())
+        stream = f"BT /F1 11 Tf 14 TL 50 750 Td {lines} ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def sample_pdfs(count: int, pages: int = 3, seed: int = 42) -> List[bytes]:
+    emails = synthetic_emails(count * pages, seed)
+    return [make_pdf(emails[i * pages:(i + 1) * pages]) for i in range(count)]
+
+
+def _pdf_escape(text: str) -> str:
+    # Helvetica padrão usa WinAnsi: acentos do português cabem em latin-1
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
@@ -0,0 +1,65 @@
+# Compara a identificação do tipo de email: varredura antiga (any(palavra in texto)
+# para cada palavra de cada tipo) contra o KeywordMatcher (índice compilado, uma passada pelo texto).
+# --extra-types adiciona tipos sintéticos para simular um arquivo de palavras-chave grande.
+#
+# Uso (a partir de backend/):
+#     python -m benchmarks.email_type_matcher --extra-types 50 --repeat 5
+import argparse
+import json
+import statistics
+import time
+from app.services.ai_response_generator import KEYWORDS_FILE
+from app.utils.keyword_matcher import KeywordMatcher
+from app.utils.training_data import EXAMPLES
+
+
+def load_keywords(extra_types: int):
+    with open(KEYWORDS_FILE, encoding="utf-8") as f:
+        keywords = {t: words for t, words in json.load(f)["Produtivo"]["types"].items()}
+    for i in range(extra_types):
+        keywords[f"sintetico{i}"] = [f"termo{i}x{j}" for j in range(10)]
+    return keywords
+
+
+def scan(keywords, text):
+    # Como era antes: primeiro tipo com alguma palavra contida no texto
+    for email_type, words in keywords.items():
+        if any(word.rstrip("*") in text for word in words):
+            return email_type
+    return "generico"
+
+
+def measure(fn, texts, repeat):
+    timings = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            fn(text)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+    timings.sort()
+    return statistics.mean(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--extra-types", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    keywords = load_keywords(args.extra_types)
+    texts = [text.lower() for text, _ in EXAMPLES]
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    total = sum(len(words) for words in keywords.values())
+    print(f"{len(keywords)} tipos, {total} palavras-chave, {len(texts)} emails x {args.repeat} (compilação: {build_ms:.1f} ms)")
+    print(f"{'':<12}{'média µs':>10}{'p50 µs':>10}{'p95 µs':>10}")
+    for name, fn in (("varredura", lambda t: scan(keywords, t)), ("matcher", matcher.match)):
+        mean, p50, p95 = measure(fn, texts, args.repeat)
+        print(f"{name:<12}{mean:>10.1f}{p50:>10.1f}{p95:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Compara os backends do encoder (torch, onnx, onnx-int8): tempo de carga, latência
+# por email, throughput em lote, memória (RSS) e paridade com o PyTorch nos EXAMPLES
+# (similaridade dos embeddings e concordância das previsões do classificador).
+#
+# Cada backend roda num subprocesso separado, para a memória de um não contaminar o outro.
+#
+# Uso (a partir de backend/):
+#     python -m benchmarks.encoder_backends
+#     python -m benchmarks.encoder_backends --backends torch onnx-int8 --threads 2
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from app.utils.training_data import EXAMPLES
+from app.utils.preprocessor_npl import preprocess
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_child(backend: str, texts_path: str, out_path: str, repeat: int):
+    with open(texts_path, encoding="utf-8") as f:
+        texts = json.load(f)
+
+    from app.services.encoder_backends import load_encoder
+
+    baseline = rss_mb()
+    start = time.perf_counter()
+    encoder = load_encoder(backend)
+    load_seconds = time.perf_counter() - start
+    loaded = rss_mb()
+
+    encoder.encode(texts[:8])  # aquecimento
+
+    single = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            encoder.encode([text])
+            single.append((time.perf_counter() - start) * 1000)
+    single.sort()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        embeddings = encoder.encode(texts)
+    batch_seconds = (time.perf_counter() - start) / repeat
+
+    np.save(out_path + ".npy", np.asarray(embeddings, dtype=np.float32))
+    with open(out_path + ".json", "w") as f:
+        json.dump({
+            "backend": backend,
+            "load_seconds": load_seconds,
+            "rss_model_mb": loaded - baseline,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "p50_ms": single[len(single) // 2],
+            "p95_ms": single[int(len(single) * 0.95) - 1],
+            "batch_texts_per_second": len(texts) / batch_seconds,
+        }, f)
+
+
+def classifier_predictions(embeddings: np.ndarray, labels):
+    from app.services.classifier_artifact import train
+
+    # Mesmo split de classifier_artifact.train (random_state=42)
+    clf = train(lambda _: embeddings)
+    _, test_idx = train_test_split(np.arange(len(labels)), test_size=0.2, random_state=42)
+    predictions = clf.predict(embeddings)
+    accuracy = float(np.mean(predictions[test_idx] == np.asarray(labels)[test_idx]))
+    return predictions, accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, help="ENCODER_THREADS para todos os backends")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--texts", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.texts, args.out, args.repeat)
+        return
+
+    texts = [preprocess(text) for text, _ in EXAMPLES]
+    labels = [label for _, label in EXAMPLES]
+    env = dict(os.environ)
+    if args.threads:
+        env["ENCODER_THREADS"] = str(args.threads)
+
+    results, embeddings = [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_path = os.path.join(tmp, "texts.json")
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(texts, f, ensure_ascii=False)
+
+        for backend in args.backends:
+            out = os.path.join(tmp, backend)
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.encoder_backends", "--child", backend,
+                 "--texts", texts_path, "--out", out, "--repeat", str(args.repeat)],
+                check=True, env=env,
+            )
+            with open(out + ".json") as f:
+                results.append(json.load(f))
+            embeddings[backend] = np.load(out + ".npy")
+
+    # Paridade contra o primeiro backend da lista (normalmente torch)
+    reference = args.backends[0]
+    ref_predictions, _ = classifier_predictions(embeddings[reference], labels)
+    for result in results:
+        emb = embeddings[result["backend"]]
+        cosine = np.sum(emb * embeddings[reference], axis=1) / (
+            np.linalg.norm(emb, axis=1) * np.linalg.norm(embeddings[reference], axis=1)
+        )
+        predictions, accuracy = classifier_predictions(emb, labels)
+        result.update({
+            "cosine_mean": float(cosine.mean()),
+            "cosine_min": float(cosine.min()),
+            "test_accuracy": accuracy,
+            "agreement": float(np.mean(predictions == ref_predictions)),
+        })
+
+    print(f"{len(texts)} emails x {args.repeat}, paridade em relação a {reference}")
+    header = f"{'backend':<11}{'carga s':>9}{'RSS MB':>9}{'pico MB':>9}{'p50 ms':>9}{'p95 ms':>9}{'lote/s':>9}{'cos méd':>9}{'cos mín':>9}{'acurácia':>10}{'concord.':>10}"
+    print(header)
+    for r in results:
+        print(f"{r['backend']:<11}{r['load_seconds']:>9.2f}{r['rss_model_mb']:>9.1f}{r['peak_rss_mb']:>9.1f}"
+              f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['batch_texts_per_second']:>9.1f}"
+              f"{r['cosine_mean']:>9.4f}{r['cosine_min']:>9.4f}{r['test_accuracy']:>10.3f}{r['agreement']:>10.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+# Suíte de desempenho do pipeline completo, para comparar execuções (antes/depois
+# de uma mudança, entre máquinas, entre configurações):
+#
+#   - partida a frio: import da aplicação, carga dos modelos e primeiro email;
+#   - latência por etapa (p50/p90/p95/p99): preprocess, classify, process_email,
+#     read_pdf, process_email com PDF e as consultas do histórico;
+#   - throughput do processamento em lote (process_emails);
+#   - throughput e latência da API (uvicorn) em vários níveis de concorrência;
+#   - pico de memória (RSS) do processo das etapas e do servidor.
+#
+# Corpus sintético (benchmarks/corpus.py) e SQLite num diretório temporário, a não
+# ser que --database-url aponte para outro banco (ex.: um Postgres local). Caches de
+# resultado e de embeddings ficam desligados para medir o trabalho de verdade.
+# O resultado sai em JSON (--output) e --compare mostra a diferença entre dois arquivos.
+#
+# Uso (a partir de backend/):
+#     python -m benchmarks.pipeline --output antes.json
+#     python -m benchmarks.pipeline --emails 500 --concurrency 1 8 32 --output depois.json
+#     python -m benchmarks.pipeline --compare antes.json depois.json --threshold 0.1
+import argparse
+import json
+import os
+import platform
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from benchmarks.corpus import sample_pdfs, synthetic_emails
+
+SCHEMA_VERSION = 1
+
+# Ambiente das medições: sem caches, sem jobs, histórico gravado na requisição
+BENCHMARK_ENV = {
+    "RESULT_CACHE_ENABLED": "false",
+    "EMBEDDING_STORE_ENABLED": "false",
+    "HISTORY_WRITE_BEHIND": "false",
+    "JOB_WORKERS": "0",
+}
+# Configurações que mudam o resultado; vão junto no JSON
+REPORTED_ENV = [
+    "ENCODER_BACKEND", "ENCODER_THREADS", "ENCODER_BATCH_SIZE", "CHUNK_MAX", "CHUNK_POOLING",
+    "SPACY_BATCH_SIZE", "SPACY_LEAN", "MICROBATCH_MAX_SIZE", "INFERENCE_WORKERS", "PDF_WORKERS",
+]
+
+
+def percentiles(samples_ms) -> dict:
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"count": 0}
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered),
+        "p50_ms": at(0.50),
+        "p90_ms": at(0.90),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "max_ms": ordered[-1],
+    }
+
+
+def time_each(fn, items) -> dict:
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def peak_rss_mb(pid: str = "self") -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_stages(data_dir: str, out_path: str, repeat: int):
+    # Processo filho: tudo é importado aqui dentro para medir a partida a frio
+    with open(os.path.join(data_dir, "emails.json"), encoding="utf-8") as f:
+        emails = json.load(f)
+    pdfs = []
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith(".pdf"):
+            with open(os.path.join(data_dir, name), "rb") as f:
+                pdfs.append(f.read())
+
+    start = time.perf_counter()
+    import main  # noqa: F401  (aplicação inteira, como o servidor importaria)
+    from app.database import SessionLocal, create_tables
+    from app.services.email_classifier import EmailClassifier
+    from app.services.email_history_service import EmailHistoryService
+    from app.services.email_processing_engine import EmailProcessingEngine
+    from app.utils.preprocessor_npl import analyze, get_nlp, preprocess
+    from app.utils.read_pdf import read_pdf
+    import_seconds = time.perf_counter() - start
+
+    create_tables()
+    start = time.perf_counter()
+    get_nlp()
+    classifier = EmailClassifier()
+    engine = EmailProcessingEngine()
+    load_seconds = time.perf_counter() - start
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        engine.process_email(emails[0], "text", db)
+        first_seconds = time.perf_counter() - start
+
+        texts = emails[1:]
+        documents = [analyze(text) for text in texts]
+        stages = {
+            "preprocess": time_each(preprocess, texts),
+            "classify": time_each(classifier.classify, documents),
+            "process_email": time_each(lambda text: engine.process_email(text, "text", db), texts),
+            "read_pdf": time_each(read_pdf, pdfs * repeat),
+            "process_pdf": time_each(lambda pdf: engine.process_email(pdf, "pdf", db), pdfs),
+        }
+
+        history = EmailHistoryService(db)
+        queries = {
+            "history_list": lambda _: history.list_emails(limit=50),
+            "history_list_category": lambda _: history.list_emails(limit=50, category="Produtivo"),
+            "history_count": lambda _: history.count_emails(),
+            "history_series": lambda _: history.stats_series(days=30),
+        }
+        for name, query in queries.items():
+            stages[name] = time_each(query, range(20 * repeat))
+
+        start = time.perf_counter()
+        engine.process_emails(texts, "text", db)
+        batch_seconds = time.perf_counter() - start
+    finally:
+        db.close()
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "cold_start": {
+                "import_seconds": import_seconds,
+                "model_load_seconds": load_seconds,
+                "first_email_seconds": first_seconds,
+                "total_seconds": import_seconds + load_seconds + first_seconds,
+            },
+            "stages": stages,
+            "batch": {"emails": len(texts), "emails_per_second": len(texts) / batch_seconds},
+            "peak_rss_mb": peak_rss_mb(),
+        }, f)
+
+
+def post(url: str, data: dict, timeout: float) -> int:
+    body = urllib.parse.urlencode(data).encode()
+    try:
+        with urllib.request.urlopen(url, data=body, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return 0
+
+
+def wait_ready(port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=5) as response:
+                if response.status == 200:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("servidor não ficou pronto a tempo")
+
+
+def run_http(env: dict, emails, levels, requests_per_level: int, port: int, timeout: float) -> dict:
+    # Um servidor uvicorn de verdade (um processo), com os modelos carregados no warm-up
+    env = dict(env, MODEL_WARMUP="true")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"], env=env,
+    )
+    try:
+        wait_ready(port, timeout)
+        ready_seconds = time.perf_counter() - start
+        url = f"http://127.0.0.1:{port}/api/email/process-text"
+
+        for text in emails[:5]:  # aquecimento
+            post(url, {"email_text": text}, timeout)
+
+        results = []
+        for level in levels:
+            batch = [emails[i % len(emails)] for i in range(requests_per_level)]
+
+            def send(text):
+                sent = time.perf_counter()
+                status = post(url, {"email_text": text}, timeout)
+                return status, (time.perf_counter() - sent) * 1000
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as pool:
+                responses = list(pool.map(send, batch))
+            elapsed = time.perf_counter() - start
+
+            statuses = {}
+            for status, _ in responses:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            ok = [latency for status, latency in responses if status == 200]
+            results.append({
+                "concurrency": level,
+                "requests": len(batch),
+                "requests_per_second": len(ok) / elapsed,
+                "error_rate": 1 - len(ok) / len(batch),
+                "statuses": statuses,
+                "latency": percentiles(ok),
+            })
+
+        return {"ready_seconds": ready_seconds, "levels": results, "peak_rss_mb": peak_rss_mb(str(server.pid))}
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def metadata(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "schema": SCHEMA_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "emails": args.emails,
+        "pdfs": args.pdfs,
+        "seed": args.seed,
+        "database": "sqlite" if args.database_url is None else args.database_url.split(":", 1)[0],
+        "config": {name: os.environ[name] for name in REPORTED_ENV if name in os.environ},
+    }
+
+
+def flatten(data, prefix: str = ""):
+    # {"stages": {"classify": {"p95_ms": 3}}} -> {"stages.classify.p95_ms": 3}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from flatten(value, f"{prefix}{key}.")
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict) and "concurrency" in item:
+                yield from flatten(item, f"{prefix}c{item['concurrency']}.")
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix.rstrip("."), float(data)
+
+
+def better_direction(metric: str) -> int:
+    # +1: maior é melhor; -1: menor é melhor; 0: não compara (contagens)
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("per_second"):
+        return 1
+    if name.endswith(("_ms", "_seconds", "_mb")) or name == "error_rate":
+        return -1
+    return 0
+
+
+def compare(base_path: str, new_path: str, threshold: float) -> int:
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    base_metrics = dict(flatten({k: v for k, v in base.items() if k != "meta"}))
+    new_metrics = dict(flatten({k: v for k, v in new.items() if k != "meta"}))
+    print(f"base: {base['meta'].get('commit')} {base['meta'].get('timestamp')}")
+    print(f"novo: {new['meta'].get('commit')} {new['meta'].get('timestamp')}")
+    if base["meta"].get("config") != new["meta"].get("config"):
+        print(f"atenção: configurações diferentes {base['meta'].get('config')} x {new['meta'].get('config')}")
+
+    regressions = 0
+    print(f"{'métrica':<48}{'base':>12}{'novo':>12}{'diferença':>11}")
+    for metric, before in base_metrics.items():
+        direction = better_direction(metric)
+        if direction == 0 or metric not in new_metrics:
+            continue
+        after = new_metrics[metric]
+        change = (after - before) / before if before else 0.0
+        worse = change * direction < -threshold
+        regressions += worse
+        print(f"{metric:<48}{before:>12.3f}{after:>12.3f}{change:>+10.1%}{'  REGRESSÃO' if worse else ''}")
+
+    print(f"{regressions} métrica(s) pioraram mais de {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=200, help="Emails do corpus sintético")
+    parser.add_argument("--pdfs", type=int, default=10, help="PDFs de exemplo (3 páginas cada)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições das etapas baratas (PDF, histórico)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="Requisições por nível de concorrência")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--database-url", help="Banco das medições (padrão: SQLite temporário)")
+    parser.add_argument("--skip-http", action="store_true", help="Não sobe o servidor")
+    parser.add_argument("--output", help="Grava o resultado (JSON) neste arquivo")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NOVO"), help="Compara dois resultados")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Piora tolerada no --compare")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+    if args.child:
+        run_stages(args.child, args.out, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        emails = synthetic_emails(args.emails, args.seed)
+        with open(os.path.join(tmp, "emails.json"), "w", encoding="utf-8") as f:
+            json.dump(emails, f, ensure_ascii=False)
+        for i, pdf in enumerate(sample_pdfs(args.pdfs, seed=args.seed)):
+            with open(os.path.join(tmp, f"sample{i:03d}.pdf"), "wb") as f:
+                f.write(pdf)
+
+        env = dict(os.environ, **BENCHMARK_ENV, MODEL_WARMUP="false",
+                   DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(tmp, 'benchmark.db')}")
+
+        stages_path = os.path.join(tmp, "stages.json")
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.pipeline", "--child", tmp, "--out", stages_path, "--repeat", str(args.repeat)],
+            check=True, env=env,
+        )
+        with open(stages_path, encoding="utf-8") as f:
+            result = {"meta": metadata(args), **json.load(f)}
+
+        if not args.skip_http:
+            result["http"] = run_http(env, emails, args.concurrency, args.requests, args.port, args.timeout)
+
+    print(f"partida a frio: {result['cold_start']['total_seconds']:.2f}s, pico de RSS: {result['peak_rss_mb']:.0f} MB, "
+          f"lote: {result['batch']['emails_per_second']:.1f} emails/s")
+    print(f"{'etapa':<24}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in result["stages"].items():
+        print(f"{name:<24}{stats['count']:>6}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    if "http" in result:
+        print(f"API pronta em {result['http']['ready_seconds']:.2f}s, pico de RSS do servidor: {result['http']['peak_rss_mb']:.0f} MB")
+        print(f"{'concorrência':<14}{'req/s':>9}{'erros':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for level in result["http"]["levels"]:
+            latency = level["latency"]
+            print(f"{level['concurrency']:<14}{level['requests_per_second']:>9.1f}{level['error_rate']:>8.1%}"
+                  f"{latency.get('p50_ms', 0):>10.2f}{latency.get('p95_ms', 0):>10.2f}{latency.get('p99_ms', 0):>10.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Compara o custo do pré-processamento por email: duas passadas do spaCy
+# (pipeline antigo: engine + classificador) contra uma passada reaproveitada.
+#
+# Uso (a partir de backend/):
+#     python -m benchmarks.preprocess_passes --repeat 5
+import argparse
+import statistics
+import time
+from app.utils.training_data import EXAMPLES
+from app.utils.preprocessor_npl import analyze, preprocess
+
+
+def double_pass(text: str):
+    # Como era antes: o engine lematiza e o classificador lematiza de novo
+    return preprocess(preprocess(text))
+
+
+def single_pass(text: str):
+    return analyze(text).lemmatized
+
+
+def measure(fn, texts, repeat):
+    timings = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            fn(text)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "mean_ms": statistics.mean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = [text for text, _ in EXAMPLES]
+    # Aquecimento para não medir a primeira chamada do spaCy
+    for text in texts[:10]:
+        analyze(text)
+
+    before = measure(double_pass, texts, args.repeat)
+    after = measure(single_pass, texts, args.repeat)
+
+    print(f"{'':<14}{'média':>10}{'p50':>10}{'p95':>10}  (ms por email, {len(texts)} emails x {args.repeat})")
+    for name, result in (("duas passadas", before), ("uma passada", after)):
+        print(f"{name:<14}{result['mean_ms']:>10.3f}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}")
+    saved = before["mean_ms"] - after["mean_ms"]
+    print(f"economia média por email: {saved:.3f} ms ({saved / before['mean_ms'] * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Compara o throughput (documentos/s) do pré-processamento: um nlp(texto) por
+# documento (como era antes) contra analyze_many (nlp.pipe) com vários batch_size,
+# n_process e com/sem os componentes que o lemmatizer não usa (SPACY_LEAN).
+# Também confere se os lemas do pipeline enxuto são iguais aos do completo.
+# Com --check só faz essa conferência: preprocess() nos EXAMPLES com e sem
+# SPACY_LEAN, saindo com código 1 se algum texto mudar.
+#
+# Uso (a partir de backend/):
+#     python -m benchmarks.spacy_pipe --docs 5000
+#     python -m benchmarks.spacy_pipe --check
+#     python -m benchmarks.spacy_pipe --batch-sizes 32 128 --processes 1 2 4
+import argparse
+import json
+import time
+from app.utils import preprocessor_npl
+from app.utils.training_data import EXAMPLES
+
+
+def corpus(docs: int):
+    # Repete os EXAMPLES até o tamanho pedido, com um sufixo para não haver textos iguais
+    texts = [text for text, _ in EXAMPLES]
+    return [f"{texts[i % len(texts)]} (ref {i})" for i in range(docs)]
+
+
+def load(lean: bool):
+    preprocessor_npl.SPACY_LEAN = lean
+    preprocessor_npl._nlp = None
+    nlp = preprocessor_npl.get_nlp()
+    return [name for name in nlp.pipe_names if name not in nlp.disabled]
+
+
+def check() -> int:
+    # preprocess() precisa dar o mesmo texto com e sem SPACY_LEAN
+    texts = [text for text, _ in EXAMPLES]
+    output = {}
+    for lean in (False, True):
+        load(lean)
+        output[lean] = [preprocessor_npl.preprocess(text) for text in texts]
+    diffs = [(text, full, lean) for text, full, lean in zip(texts, output[False], output[True]) if full != lean]
+    for text, full, lean in diffs:
+        print(f"{text!r}\n  completo: {full!r}\n  enxuto:   {lean!r}")
+    print(f"preprocess() igual com SPACY_LEAN: {len(texts) - len(diffs)}/{len(texts)}")
+    return 1 if diffs else 0
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[16, 64, 256])
+    parser.add_argument("--processes", nargs="+", type=int, default=[1, 2])
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    parser.add_argument("--check", action="store_true", help="Só confere se o preprocess() muda com SPACY_LEAN")
+    args = parser.parse_args()
+    if args.check:
+        raise SystemExit(check())
+
+    texts = corpus(args.docs)
+    # O benchmark escolhe n_process explicitamente, mesmo em listas pequenas
+    preprocessor_npl.SPACY_PARALLEL_MIN_DOCS = 0
+
+    results, lemmas = [], {}
+    for lean in (False, True):
+        components = load(lean)
+        label = "enxuto" if lean else "completo"
+
+        output, seconds = timed(lambda: [preprocessor_npl.preprocess(text) for text in texts])
+        results.append({"pipeline": label, "mode": "nlp() por doc", "batch_size": 1, "n_process": 1,
+                        "docs_per_second": len(texts) / seconds, "components": components})
+        lemmas[label] = output
+
+        for n_process in args.processes:
+            for batch_size in args.batch_sizes:
+                output, seconds = timed(lambda: list(preprocessor_npl.preprocess_many(texts, batch_size, n_process)))
+                if output != lemmas[label]:
+                    raise SystemExit(f"preprocess_many divergiu de preprocess (batch {batch_size}, {n_process} processos)")
+                results.append({"pipeline": label, "mode": "nlp.pipe", "batch_size": batch_size, "n_process": n_process,
+                                "docs_per_second": len(texts) / seconds, "components": components})
+
+    same = sum(a == b for a, b in zip(lemmas["completo"], lemmas["enxuto"]))
+    baseline = results[0]["docs_per_second"]
+    print(f"{len(texts)} documentos; lemas iguais entre completo e enxuto: {same}/{len(texts)}")
+    for pipeline in ("completo", "enxuto"):
+        components = next(r["components"] for r in results if r["pipeline"] == pipeline)
+        print(f"{pipeline}: {', '.join(components) or '-'}")
+    print(f"{'pipeline':<10}{'modo':<15}{'batch':>7}{'procs':>7}{'docs/s':>10}{'vs. antes':>11}")
+    for r in results:
+        print(f"{r['pipeline']:<10}{r['mode']:<15}{r['batch_size']:>7}{r['n_process']:>7}"
+              f"{r['docs_per_second']:>10.1f}{r['docs_per_second'] / baseline:>10.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"lemma_agreement": same / len(texts), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Mede a memória por processo do servidor gunicorn (gunicorn.conf.py), com e sem
+# preload dos modelos no master. RSS conta as páginas compartilhadas em cada
+# processo; PSS divide as compartilhadas entre quem as usa, então a soma do PSS
+# é a memória real ocupada pelo conjunto.
+#
+# Uso (a partir de backend/, com DATABASE_URL configurado):
+#     python -m benchmarks.worker_memory --workers 4
+#     python -m benchmarks.worker_memory --workers 4 --no-compare   # só com preload
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def smaps(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": values.get("Rss", 0.0),
+        "pss_mb": values.get("Pss", 0.0),
+        "shared_mb": values.get("Shared_Clean", 0.0) + values.get("Shared_Dirty", 0.0),
+        "private_mb": values.get("Private_Clean", 0.0) + values.get("Private_Dirty", 0.0),
+    }
+
+
+def children(pid: int) -> list:
+    pids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            pids.extend(int(child) for child in f.read().split())
+    return pids
+
+
+def wait_ready(port: int, workers: int, timeout: float):
+    # Uma resposta 200 por worker não é garantida, então espera algumas seguidas
+    deadline = time.monotonic() + timeout
+    ok = 0
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=5) as response:
+                ok = ok + 1 if response.status == 200 else 0
+        except Exception:
+            ok = 0
+        if ok >= workers * 3:
+            return
+        time.sleep(0.5)
+    raise TimeoutError("servidor não ficou pronto a tempo")
+
+
+def measure(workers: int, preload: bool, port: int, timeout: float, requests: int) -> dict:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port),
+               GUNICORN_PRELOAD="true" if preload else "false", JOB_WORKERS="0")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"], env=env)
+    try:
+        wait_ready(port, workers, timeout)
+
+        # Algumas classificações para os workers tocarem nas páginas dos modelos
+        for i in range(requests):
+            body = f"email_text=Preciso+de+ajuda+com+o+sistema+{i}".encode()
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/email/process-text", data=body, timeout=60).read()
+
+        master = smaps(server.pid)
+        worker_stats = [smaps(pid) for pid in children(server.pid)]
+        return {
+            "preload": preload,
+            "workers": workers,
+            "master": master,
+            "per_worker": worker_stats,
+            "total_pss_mb": master["pss_mb"] + sum(w["pss_mb"] for w in worker_stats),
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--no-compare", action="store_true", help="Mede só o modo com preload")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    modes = [True] if args.no_compare else [True, False]
+    results = [measure(args.workers, preload, args.port, args.timeout, args.requests) for preload in modes]
+
+    print(f"{'modo':<12}{'processo':<10}{'RSS MB':>9}{'PSS MB':>9}{'compart.':>10}{'privada':>9}")
+    for result in results:
+        mode = "preload" if result["preload"] else "sem preload"
+        rows = [("master", result["master"])] + [(f"worker {i}", w) for i, w in enumerate(result["per_worker"])]
+        for name, stats in rows:
+            print(f"{mode:<12}{name:<10}{stats['rss_mb']:>9.1f}{stats['pss_mb']:>9.1f}{stats['shared_mb']:>10.1f}{stats['private_mb']:>9.1f}")
+        print(f"{mode:<12}{'total PSS':<10}{result['total_pss_mb']:>18.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
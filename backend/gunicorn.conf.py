@@ -0,0 +1,87 @@
+# Servidor multi-processo com modelos compartilhados entre os workers.
+#
+# O master importa a aplicação (preload_app) e carrega spaCy, encoder e
+# classificador uma única vez; os workers são criados por fork e herdam essas
+# páginas de memória copy-on-write, em vez de cada um carregar a sua cópia.
+# O pool de jobs sobe uma vez só, no master (when_ready), com ou sem preload;
+# os workers da API não sobem o seu (JOB_WORKERS_IN_APP=false).
+#
+# Uso (a partir de backend/):
+#     gunicorn -c gunicorn.conf.py main:app
+#     WEB_CONCURRENCY=4 gunicorn -c gunicorn.conf.py main:app
+import gc
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+# Definido no master antes de importar a aplicação; os workers herdam
+raw_env = ["JOB_WORKERS_IN_APP=false"]
+
+
+def on_starting(server):
+    # Métricas de vários processos: arquivos de uma execução anterior não valem mais
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for name in os.listdir(multiproc_dir):
+            if name.endswith(".db"):
+                os.remove(os.path.join(multiproc_dir, name))
+
+    if not preload_app:
+        return
+
+    from app.services.model_warmup import preload_models
+
+    seconds = preload_models()
+    server.log.info(f"Modelos carregados no master em {seconds:.1f}s")
+
+    # Tudo o que existe até aqui vai para a geração permanente: o coletor dos
+    # workers não percorre (nem escreve nos cabeçalhos de) esses objetos,
+    # o que preservaria as páginas compartilhadas
+    gc.collect()
+    gc.freeze()
+
+
+def when_ready(server):
+    # Único lugar que sobe o pool de jobs no gunicorn: um pool, no master,
+    # antes dos workers serem criados
+    from app.services.job_worker import JOB_WORKERS, JobWorkerPool
+
+    if JOB_WORKERS > 0:
+        JobWorkerPool().start()
+        server.log.info(f"Pool de jobs iniciado no master ({JOB_WORKERS} processos)")
+
+
+def post_fork(server, worker):
+    from app.database import engine
+    from app.services.encoder_backends import ENCODER_THREADS
+    from app.services.job_worker import JobWorkerPool
+
+    # Conexões herdadas do master não podem ser usadas pelo worker
+    engine.dispose(close=False)
+
+    # O pool de jobs do master é herdado pelo fork, mas pertence ao master
+    JobWorkerPool().detach()
+
+    # Divide os núcleos entre os workers em vez de cada um usar todos
+    # (só no backend torch; no ONNX Runtime as threads são fixadas por ENCODER_THREADS)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(ENCODER_THREADS or max(1, (os.cpu_count() or 1) // workers))
+
+
+def child_exit(server, worker):
+    # Gauges do worker que saiu deixam de contar no /metrics
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    from app.services.job_worker import JobWorkerPool
+    JobWorkerPool().stop()
@@ -1,10 +1,19 @@
+import time
 from app.database import create_tables, get_db
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.controllers.email_processing_controller import router as email_router
 from app.controllers.history_controller import router as history_router
-
-create_tables()
+from app.controllers.jobs_controller import router as jobs_router
+from app.controllers.health_controller import router as health_router
+from app.controllers.metrics_controller import router as metrics_router
+from app.services.email_classifier import EmailClassifier
+from app.services.inference_executor import InferenceExecutor
+from app.services.history_writer import HistoryWriter, HISTORY_WRITE_BEHIND
+from app.services.job_worker import JobWorkerPool, JOB_WORKERS, JOB_WORKERS_IN_APP
+from app.services.model_warmup import ModelWarmup, MODEL_WARMUP
+from app.services.online_learning import OnlineTrainer, ONLINE_LEARNING_ENABLED
+from app.services import metrics
 
 app = FastAPI(
     title="AutoMail API",
@@ -19,6 +28,7 @@ app = FastAPI(
     * **Processar Texto**: Analisa texto de email diretamente
     * **Processar PDF**: Extrai e analisa texto de arquivos PDF
     * **Processar TXT**: Analisa arquivos de texto
+    * **Jobs**: Processa lotes e arquivos grandes em segundo plano
     * **Histórico**: Consulta emails processados anteriormente
     * **Estatísticas**: Visualiza métricas do sistema
     
@@ -37,8 +47,74 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
 
 app.include_router(email_router, prefix="/api/email", tags=["Email Processing"])
-app.include_router(history_router, prefix="/api/history", tags=["Histórico"])
\ No newline at end of file
+app.include_router(history_router, prefix="/api/history", tags=["Histórico"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(health_router, prefix="/health", tags=["Health"])
+app.include_router(metrics_router)
+
+
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    # Mede a requisição inteira e junta as etapas executadas por ela
+    # (spaCy, encoder, classificador, resposta, banco) no header Server-Timing
+    with metrics.capture() as timings:
+        start = time.perf_counter()
+        response = await call_next(request)
+        total = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    metrics.observe_request(request.method, getattr(route, "path", "desconhecida"), response.status_code, total)
+    if metrics.SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings, total)
+    return response
+
+
+@app.on_event("startup")
+def prepare_database():
+    create_tables()
+
+
+@app.on_event("startup")
+def start_model_warmup():
+    # Modelos carregam em segundo plano; com MODEL_WARMUP=false, só na primeira classificação
+    if MODEL_WARMUP:
+        ModelWarmup().start()
+
+
+@app.on_event("startup")
+def start_history_writer():
+    if HISTORY_WRITE_BEHIND:
+        HistoryWriter().start()
+
+
+@app.on_event("startup")
+def start_online_training():
+    # Correções de categoria gravadas no banco atualizam o classificador em segundo plano
+    if ONLINE_LEARNING_ENABLED:
+        OnlineTrainer().start()
+
+
+@app.on_event("startup")
+def start_job_workers():
+    # JOB_WORKERS=0: workers rodam à parte com python -m app.job_worker;
+    # no gunicorn (JOB_WORKERS_IN_APP=false) quem sobe o pool é o master
+    if JOB_WORKERS > 0 and JOB_WORKERS_IN_APP:
+        JobWorkerPool().start()
+
+
+@app.on_event("shutdown")
+def shutdown_inference_executor():
+    if JOB_WORKERS > 0 and JOB_WORKERS_IN_APP:
+        JobWorkerPool().stop()
+    if ONLINE_LEARNING_ENABLED:
+        OnlineTrainer().stop()
+    InferenceExecutor().shutdown()
+    # Grava o que ainda está no buffer antes de sair
+    if HISTORY_WRITE_BEHIND:
+        HistoryWriter().close()
+    EmailClassifier.flush_embeddings()
@@ -30,25 +30,29 @@ interface EmailHistoryProps {
 }
 
 const EmailHistory = ({ onBack }: EmailHistoryProps) => {
-  const [emails, setEmails] = useState([]);
+  const [emails, setEmails] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [currentPage, setCurrentPage] = useState(1);
   const [filter, setFilter] = useState('all'); // 'all', 'Produtivo', 'Improdutivo'
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   const emailsPerPage = 3;
 
+  // A API devolve uma página por vez; o cursor da próxima vem no header X-Next-Cursor
+  const fetchPage = async (cursor: string | null) => {
+    const url = filter === 'all' ? '/history/' : `/history/category/${filter}`;
+    const response = await api.get(url, { params: cursor ? { cursor } : {} });
+    setNextCursor(response.headers['x-next-cursor'] || null);
+    return response.data;
+  };
+
   useEffect(() => {
     const fetchEmails = async () => {
       setLoading(true);
       try {
-        let response;
-        if (filter === 'all') {
-          response = await api.get('/history/');
-        } else {
-          response = await api.get(`/history/category/${filter}`);
-        }
-        setEmails(response.data);
+        setEmails(await fetchPage(null));
         setCurrentPage(1); // Reset para primeira página ao mudar filtro
       } catch (err: any) {
         setError('Erro ao carregar o histórico de emails.');
@@ -60,6 +64,18 @@ const EmailHistory = ({ onBack }: EmailHistoryProps) => {
     fetchEmails();
   }, [filter]);
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const more = await fetchPage(nextCursor);
+      setEmails((current) => current.concat(more));
+    } catch (err: any) {
+      setError('Erro ao carregar o histórico de emails.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Calcular emails para a página atual
   const startIndex = (currentPage - 1) * emailsPerPage;
   const endIndex = startIndex + emailsPerPage;
@@ -153,7 +169,22 @@ const EmailHistory = ({ onBack }: EmailHistoryProps) => {
             sx={{ textAlign: 'center', mt: 2, color: 'text.secondary' }}
           >
             Mostrando {startIndex + 1}-{Math.min(endIndex, emails.length)} de {emails.length} emails
+            {nextCursor ? ' carregados (há mais no histórico)' : ''}
           </Typography>
+
+          {/* Próxima página da API */}
+          {nextCursor && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+              <Button
+                variant="outlined"
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                sx={{ textTransform: 'none' }}
+              >
+                {loadingMore ? <CircularProgress size={20} /> : 'Carregar mais emails'}
+              </Button>
+            </Box>
+          )}
         </>
       )}
 